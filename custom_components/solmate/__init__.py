@@ -6,36 +6,86 @@ import logging
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import config_validation as cv, entity_registry as er
+from homeassistant.helpers.start import async_at_started
+from homeassistant.helpers.typing import ConfigType
+
+from .const import DOMAIN
+from .services import async_setup_services
+from .solmate_controller import SolmateController
+from .websocket_api import async_setup_websocket_api
+
+SolmateConfigEntry = ConfigEntry[SolmateController]
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
 PLATFORMS: list[Platform] = [Platform.SENSOR]
 
 _LOGGER = logging.getLogger(__name__)
 
 
-async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the solmate integration."""
+    async_setup_services(hass)
+    async_setup_websocket_api(hass)
+    return True
+
+
+async def async_setup_entry(hass: HomeAssistant, entry: SolmateConfigEntry) -> bool:
     """Set up solmate from a config entry."""
 
+    await _async_migrate_unique_ids(hass, entry)
+
+    controller = SolmateController(hass, entry)
+    await controller.async_load()
+    entry.runtime_data = controller
+
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     entry.async_on_unload(entry.add_update_listener(config_entry_update_listener))
 
+    @callback
+    def _async_start_controller(hass: HomeAssistant) -> None:
+        """Start the controller once Home Assistant has started."""
+        # Tied to the entry, so unloading during the warm start cancels it.
+        entry.async_create_background_task(
+            hass, controller.async_start(), f"{DOMAIN} start {entry.entry_id}"
+        )
+
+    entry.async_on_unload(async_at_started(hass, _async_start_controller))
+    # Unload callbacks run last to first: stop, then save what was counted.
+    entry.async_on_unload(controller.async_save)
+    entry.async_on_unload(controller.stop)
+
     return True
 
 
-async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Unload a config entry."""
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+async def _async_migrate_unique_ids(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Move entities from the old global unique ids to per-entry ones."""
+    legacy_unique_ids = {
+        "solmate_controller": f"{entry.entry_id}_controller",
+        "solmate_surplus_power": f"{entry.entry_id}_surplus_power",
+    }
 
+    @callback
+    def _migrate(entity_entry: er.RegistryEntry) -> dict[str, str] | None:
+        if new_unique_id := legacy_unique_ids.get(entity_entry.unique_id):
+            return {"new_unique_id": new_unique_id}
+        return None
 
-async def config_entry_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Update listener, called when the config entry options are changed."""
-    await hass.config_entries.async_reload(entry.entry_id)
+    await er.async_migrate_entries(hass, entry.entry_id, _migrate)
 
 
-# async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
-#     """Set up the solmate integration."""
-#     # States are in the format DOMAIN.OBJECT_ID.
-#     hass.states.async_set("solmate.Hello_World", "Works!")
+async def async_unload_entry(hass: HomeAssistant, entry: SolmateConfigEntry) -> bool:
+    """Unload a config entry."""
+    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
 
-#     # Return boolean to indicate that initialization was successfully.
-#     return True
+
+async def config_entry_update_listener(
+    hass: HomeAssistant, entry: SolmateConfigEntry
+) -> None:
+    """Update listener, called when the config entry options are changed."""
+    # Reloading restarts the state machine through reset, which turns the
+    # charger off, so only reload when the options can't be applied in place.
+    if not entry.runtime_data.async_update_options(entry.options):
+        await hass.config_entries.async_reload(entry.entry_id)
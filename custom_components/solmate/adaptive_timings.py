@@ -0,0 +1,133 @@
+"""Debounce timings that adapt to the variability of the surplus."""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable, Mapping
+from datetime import timedelta
+import math
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, callback
+
+VOLATILITY_WINDOW = timedelta(minutes=5)
+# Surplus standard deviation at which the timings reach their upper bound.
+VOLATILITY_SCALE = 1000.0
+
+DEFAULT_DEBOUNCE_MIN = 3
+DEFAULT_DEBOUNCE_MAX = 30
+DEFAULT_SESSION_PAUSE_MIN = 10
+DEFAULT_SESSION_PAUSE_MAX = 120
+
+
+class SurplusVolatility:
+    """Standard deviation of the surplus over a sliding time window.
+
+    Running sums are updated as samples enter and leave the window, so each
+    sample costs amortized O(1).
+    """
+
+    def __init__(self, window: timedelta = VOLATILITY_WINDOW) -> None:
+        """Initialize the estimator."""
+        self._window = window.total_seconds()
+        self._samples: deque[tuple[float, float]] = deque()
+        self._sum = 0.0
+        self._sum_sq = 0.0
+
+    def add_sample(self, timestamp: float, surplus: float) -> None:
+        """Add a sample and drop the ones that left the window."""
+        self._samples.append((timestamp, surplus))
+        self._sum += surplus
+        self._sum_sq += surplus * surplus
+        while self._samples[0][0] < timestamp - self._window:
+            _, old = self._samples.popleft()
+            self._sum -= old
+            self._sum_sq -= old * old
+
+    @property
+    def std_dev(self) -> float:
+        """Return the standard deviation of the samples in the window."""
+        count = len(self._samples)
+        if count < 2:
+            return 0.0
+        mean = self._sum / count
+        return math.sqrt(max(0.0, self._sum_sq / count - mean * mean))
+
+
+class AdaptiveTimings:
+    """Chooses debounce and pause durations within configured bounds."""
+
+    def __init__(self, options: Mapping[str, Any]) -> None:
+        """Initialize the timings."""
+        self.volatility = SurplusVolatility()
+        self._listeners: list[Callable[[], None]] = []
+        self._ratio = 0.0
+        self._debounce = (DEFAULT_DEBOUNCE_MIN, DEFAULT_DEBOUNCE_MAX)
+        self._session_pause = (DEFAULT_SESSION_PAUSE_MIN, DEFAULT_SESSION_PAUSE_MAX)
+        self.update_bounds(options)
+
+    @callback
+    def update_bounds(self, options: Mapping[str, Any]) -> None:
+        """Read the bounds from the config entry options."""
+        previous = self.as_dict()
+        self._debounce = (
+            options.get("debounce_min", DEFAULT_DEBOUNCE_MIN),
+            options.get("debounce_max", DEFAULT_DEBOUNCE_MAX),
+        )
+        self._session_pause = (
+            options.get("session_pause_min", DEFAULT_SESSION_PAUSE_MIN),
+            options.get("session_pause_max", DEFAULT_SESSION_PAUSE_MAX),
+        )
+        if self.as_dict() != previous:
+            self._notify()
+
+    @callback
+    def async_add_listener(self, listener: Callable[[], None]) -> CALLBACK_TYPE:
+        """Call listener whenever the chosen timings change, return a remover."""
+        self._listeners.append(listener)
+
+        @callback
+        def remove() -> None:
+            self._listeners.remove(listener)
+
+        return remove
+
+    @callback
+    def add_sample(self, timestamp: float, surplus: float) -> None:
+        """Update the volatility estimate with a surplus sample."""
+        self.volatility.add_sample(timestamp, surplus)
+        previous = self.as_dict()
+        self._ratio = min(1.0, self.volatility.std_dev / VOLATILITY_SCALE)
+        if self.as_dict() != previous:
+            self._notify()
+
+    def _notify(self) -> None:
+        for listener in self._listeners:
+            listener()
+
+    def _scaled(self, bounds: tuple[float, float]) -> timedelta:
+        low, high = bounds
+        return timedelta(seconds=round(low + (max(low, high) - low) * self._ratio))
+
+    @property
+    def start_debounce(self) -> timedelta:
+        """Return how long the surplus must last before charging starts."""
+        return self._scaled(self._debounce)
+
+    @property
+    def stop_debounce(self) -> timedelta:
+        """Return how long the deficit must last before charging stops."""
+        return self._scaled(self._debounce)
+
+    @property
+    def session_pause(self) -> timedelta:
+        """Return how long to pause after charging stopped."""
+        return self._scaled(self._session_pause)
+
+    def as_dict(self) -> dict[str, float]:
+        """Return the chosen timings in seconds."""
+        return {
+            "charge_start_debounce": self.start_debounce.total_seconds(),
+            "charge_stop_debounce": self.stop_debounce.total_seconds(),
+            "charge_session_pause": self.session_pause.total_seconds(),
+        }
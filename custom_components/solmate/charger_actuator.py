@@ -0,0 +1,248 @@
+"""Charger commands issued as acknowledged, retried service calls."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from dataclasses import dataclass
+import logging
+import math
+import time
+from typing import Any
+
+from homeassistant.components.number import ATTR_MAX, ATTR_MIN
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import async_call_later
+
+from .tracing import TraceBuffer, Tracer
+
+_LOGGER = logging.getLogger(__name__)
+
+COMMAND_TIMEOUT = 30.0
+COMMAND_RETRIES = 2
+AMPS_TOLERANCE = 1.0
+# Minimum seconds between amps commands while charging.
+AMPS_COMMAND_INTERVAL = 30.0
+
+SETTABLE_NUMBER_DOMAINS = ("number", "input_number")
+
+
+@dataclass
+class _Command:
+    """A charger command and how to recognize that it took effect."""
+
+    name: str
+    domain: str
+    service: str
+    data: dict[str, Any]
+    confirmed: Callable[[float], bool] | None
+
+
+class ChargerActuator:
+    """Sends commands to the charger without blocking the caller.
+
+    Each command runs as a background task that calls the entity's service,
+    then waits until the current charging amps reflect the command. Commands
+    that time out are retried a bounded number of times. A new command of the
+    same kind (switch or amps) supersedes the one still in flight.
+
+    Requested amps are clamped to the entity's min and max. While charging,
+    amps commands are sent at most once per AMPS_COMMAND_INTERVAL; a change
+    requested sooner is held back and only the latest one is sent.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        charger_switch_entity: str,
+        charger_requested_charging_amps_entity: str,
+        trace_buffer: TraceBuffer | None = None,
+        *,
+        call_later: Callable[..., Callable[[], None]] = async_call_later,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Initialize the actuator."""
+        self._hass = hass
+        self._charger_switch_entity = charger_switch_entity
+        self._charger_requested_charging_amps_entity = (
+            charger_requested_charging_amps_entity
+        )
+        self._tracer = Tracer(_LOGGER, trace_buffer or TraceBuffer())
+        self._current_amps = 0.0
+        self._switch_on = False
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._waiters: dict[str, tuple[Callable[[float], bool], asyncio.Future]] = {}
+        self._call_later = call_later
+        self._clock = clock
+        self._requested_amps: float | None = None
+        self._last_amps_command = -math.inf
+        self._cancel_held_amps: Callable[[], None] | None = None
+
+    @callback
+    def turn_on(self) -> None:
+        """Turn the charger on."""
+        self._switch_on = True
+        self._submit(
+            "switch",
+            _Command(
+                "turn_on",
+                self._charger_switch_entity.split(".")[0],
+                "turn_on",
+                {ATTR_ENTITY_ID: self._charger_switch_entity},
+                lambda amps: amps > 0,
+            ),
+        )
+
+    @callback
+    def turn_off(self) -> None:
+        """Turn the charger off."""
+        self._switch_on = False
+        # Some chargers reset the requested amps when they stop.
+        self._requested_amps = None
+        self._submit(
+            "switch",
+            _Command(
+                "turn_off",
+                self._charger_switch_entity.split(".")[0],
+                "turn_off",
+                {ATTR_ENTITY_ID: self._charger_switch_entity},
+                lambda amps: amps == 0,
+            ),
+        )
+
+    @callback
+    def set_amps(self, amps: float) -> None:
+        """Set the requested charging amps."""
+        if amps is None:
+            raise ValueError("Requested charging amps must be a number")
+        amps = self._clamp_amps(amps)
+        domain = self._charger_requested_charging_amps_entity.split(".")[0]
+        if domain not in SETTABLE_NUMBER_DOMAINS:
+            # Entities without a set_value service can only be overwritten.
+            self._hass.states.async_set(
+                self._charger_requested_charging_amps_entity, amps
+            )
+            return
+        self._drop_held_amps()
+        if amps == self._requested_amps:
+            return
+        wait = self._last_amps_command + AMPS_COMMAND_INTERVAL - self._clock()
+        if self._switch_on and wait > 0:
+            self._tracer.debug("Holding back set_amps %s for %.0f s", amps, wait)
+
+            @callback
+            def _send_held_amps(_now: Any) -> None:
+                self._cancel_held_amps = None
+                self._send_amps(domain, amps)
+
+            self._cancel_held_amps = self._call_later(self._hass, wait, _send_held_amps)
+            return
+        self._send_amps(domain, amps)
+
+    def _clamp_amps(self, amps: float) -> float:
+        """Return amps within the requested amps entity's min and max."""
+        state = self._hass.states.get(self._charger_requested_charging_amps_entity)
+        if state is None:
+            return amps
+        clamped = amps
+        if (low := state.attributes.get(ATTR_MIN)) is not None:
+            clamped = max(clamped, low)
+        if (high := state.attributes.get(ATTR_MAX)) is not None:
+            clamped = min(clamped, high)
+        if clamped != amps:
+            self._tracer.debug("Clamped requested amps %s to %s", amps, clamped)
+        return clamped
+
+    def _drop_held_amps(self) -> None:
+        """Drop the amps command held back by the command interval, if any."""
+        if self._cancel_held_amps is not None:
+            self._cancel_held_amps()
+            self._cancel_held_amps = None
+
+    def _send_amps(self, domain: str, amps: float) -> None:
+        self._requested_amps = amps
+        self._last_amps_command = self._clock()
+        confirmed = None
+        if self._switch_on:
+            # The car only draws the requested amps while charging.
+            def confirmed(current: float) -> bool:
+                return abs(current - amps) <= AMPS_TOLERANCE
+
+        self._submit(
+            "amps",
+            _Command(
+                f"set_amps {amps}",
+                domain,
+                "set_value",
+                {
+                    ATTR_ENTITY_ID: self._charger_requested_charging_amps_entity,
+                    "value": amps,
+                },
+                confirmed,
+            ),
+        )
+
+    @callback
+    def current_amps_changed(self, amps: float) -> None:
+        """Confirm the in-flight commands the new charging amps satisfy."""
+        self._current_amps = amps
+        for confirmed, future in self._waiters.values():
+            if not future.done() and confirmed(amps):
+                future.set_result(None)
+
+    @callback
+    def stop(self) -> None:
+        """Cancel all in-flight commands."""
+        self._drop_held_amps()
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+
+    def _submit(self, kind: str, command: _Command) -> None:
+        if (task := self._tasks.get(kind)) and not task.done():
+            self._tracer.debug("Superseding in-flight %s command", kind)
+            task.cancel()
+        self._tasks[kind] = self._hass.async_create_background_task(
+            self._async_run(kind, command), f"solmate charger {command.name}"
+        )
+
+    async def _async_run(self, kind: str, command: _Command) -> None:
+        for attempt in range(1 + COMMAND_RETRIES):
+            future = self._hass.loop.create_future()
+            try:
+                async with asyncio.timeout(COMMAND_TIMEOUT):
+                    await self._hass.services.async_call(
+                        command.domain, command.service, command.data, blocking=True
+                    )
+                    if command.confirmed is None or command.confirmed(
+                        self._current_amps
+                    ):
+                        return
+                    self._waiters[kind] = (command.confirmed, future)
+                    await future
+                    return
+            except TimeoutError:
+                self._tracer.warning(
+                    "Charger command %s not confirmed within %s s (attempt %s)",
+                    command.name,
+                    COMMAND_TIMEOUT,
+                    attempt + 1,
+                )
+            except HomeAssistantError as err:
+                self._tracer.warning(
+                    "Charger command %s failed (attempt %s): %s",
+                    command.name,
+                    attempt + 1,
+                    err,
+                )
+            finally:
+                if self._waiters.get(kind, (None, None))[1] is future:
+                    del self._waiters[kind]
+
+        self._tracer.error(
+            "Giving up on charger command %s after %s attempts",
+            command.name,
+            1 + COMMAND_RETRIES,
+        )
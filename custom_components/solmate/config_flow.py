@@ -15,6 +15,7 @@ from homeassistant.helpers.schema_config_entry_flow import (
     SchemaFlowFormStep,
 )
 from homeassistant.helpers.selector import (
+    BooleanSelector,
     DeviceSelector,
     DeviceSelectorConfig,
     EntitySelector,
@@ -22,9 +23,18 @@ from homeassistant.helpers.selector import (
     NumberSelector,
     NumberSelectorConfig,
     NumberSelectorMode,
+    SelectSelector,
+    SelectSelectorConfig,
 )
 
-from .const import DOMAIN
+from .adaptive_timings import (
+    DEFAULT_DEBOUNCE_MAX,
+    DEFAULT_DEBOUNCE_MIN,
+    DEFAULT_SESSION_PAUSE_MAX,
+    DEFAULT_SESSION_PAUSE_MIN,
+)
+from .const import AMPS_ROUNDING_MODES, DOMAIN
+from .decision_exporter import EXPORT_FORMATS
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -68,6 +78,7 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
                 mode=NumberSelectorMode.SLIDER,
             )
         ),
+        vol.Required("charge_home_battery_first", default=False): BooleanSelector(),
         vol.Required("power_buffer", default=500): NumberSelector(
             NumberSelectorConfig(
                 min=0,
@@ -76,6 +87,68 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
                 mode=NumberSelectorMode.BOX,
             )
         ),
+        vol.Required("amps_rounding", default="floor"): SelectSelector(
+            SelectSelectorConfig(
+                options=AMPS_ROUNDING_MODES, translation_key="amps_rounding"
+            )
+        ),
+        vol.Optional("pv_forecast_entity"): EntitySelector(
+            EntitySelectorConfig(domain="sensor")
+        ),
+        vol.Required("car_target_energy", default=0): NumberSelector(
+            NumberSelectorConfig(
+                min=0,
+                max=200,
+                step=0.5,
+                unit_of_measurement="kWh",
+                mode=NumberSelectorMode.BOX,
+            )
+        ),
+        vol.Required("debounce_min", default=DEFAULT_DEBOUNCE_MIN): NumberSelector(
+            NumberSelectorConfig(
+                min=1, max=600, unit_of_measurement="s", mode=NumberSelectorMode.BOX
+            )
+        ),
+        vol.Required("debounce_max", default=DEFAULT_DEBOUNCE_MAX): NumberSelector(
+            NumberSelectorConfig(
+                min=1, max=600, unit_of_measurement="s", mode=NumberSelectorMode.BOX
+            )
+        ),
+        vol.Required(
+            "session_pause_min", default=DEFAULT_SESSION_PAUSE_MIN
+        ): NumberSelector(
+            NumberSelectorConfig(
+                min=1, max=3600, unit_of_measurement="s", mode=NumberSelectorMode.BOX
+            )
+        ),
+        vol.Required(
+            "session_pause_max", default=DEFAULT_SESSION_PAUSE_MAX
+        ): NumberSelector(
+            NumberSelectorConfig(
+                min=1, max=3600, unit_of_measurement="s", mode=NumberSelectorMode.BOX
+            )
+        ),
+        vol.Required("poll_interval", default=0): NumberSelector(
+            NumberSelectorConfig(
+                min=0,
+                max=3600,
+                unit_of_measurement="s",
+                mode=NumberSelectorMode.BOX,
+            )
+        ),
+        vol.Required("warm_start_minutes", default=0): NumberSelector(
+            NumberSelectorConfig(
+                min=0,
+                max=60,
+                unit_of_measurement="min",
+                mode=NumberSelectorMode.BOX,
+            )
+        ),
+        vol.Required("export_format", default="off"): SelectSelector(
+            SelectSelectorConfig(
+                options=EXPORT_FORMATS, translation_key="export_format"
+            )
+        ),
     }
 )
 
@@ -1,3 +1,10 @@
 """Constants for the solmate integration."""
 
 DOMAIN = "solmate"
+
+DATA_FLEET_DISPATCHER = f"{DOMAIN}_fleet_dispatcher"
+
+AMPS_ROUNDING_MODES = ["floor", "nearest"]
+
+MIN_CHARGING_AMPS = 5
+MAX_CHARGING_AMPS = 32
@@ -0,0 +1,87 @@
+"""Polling coordinator for input sources that don't push updates."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import timedelta
+import logging
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+_LOGGER = logging.getLogger(__name__)
+
+FAST_POLL_INTERVAL = timedelta(seconds=5)
+NIGHT_POLL_INTERVAL = timedelta(minutes=5)
+
+PENDING_STATES = ("charge_start_pending", "stop_charge_pending")
+SUN_BELOW_HORIZON = "below_horizon"
+
+
+class SolmatePollingCoordinator(DataUpdateCoordinator[None]):
+    """Polls all controller inputs in one batch per cycle.
+
+    The poll rate adapts to the controller state: faster while a start or
+    stop is pending, slower while not charging at night.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        entity_ids: list[str],
+        pv_production_entity: str,
+        interval: timedelta,
+        controller_state: Callable[[], str],
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            config_entry=entry,
+            name="solmate inputs",
+            update_interval=interval,
+        )
+        self._entity_ids = entity_ids
+        self._pv_production_entity = pv_production_entity
+        self._interval = interval
+        self._controller_state = controller_state
+
+    async def _async_update_data(self) -> None:
+        """Ask every input entity to update itself."""
+        try:
+            await self.hass.services.async_call(
+                "homeassistant",
+                "update_entity",
+                {ATTR_ENTITY_ID: self._entity_ids},
+                blocking=True,
+            )
+        except HomeAssistantError as err:
+            raise UpdateFailed(f"Error polling solmate inputs: {err}") from err
+
+    @callback
+    def async_update_interval(self) -> None:
+        """Adapt the poll rate to the controller state, once it has evaluated."""
+        interval = self._next_interval()
+        if interval != self.update_interval:
+            self.update_interval = interval
+            self._schedule_refresh()
+
+    def _next_interval(self) -> timedelta:
+        state = self._controller_state()
+        if state in PENDING_STATES:
+            return min(self._interval, FAST_POLL_INTERVAL)
+        if state == "not_charging" and self._is_night():
+            return max(self._interval, NIGHT_POLL_INTERVAL)
+        return self._interval
+
+    def _is_night(self) -> bool:
+        if (sun := self.hass.states.get("sun.sun")) is not None:
+            return sun.state == SUN_BELOW_HORIZON
+        try:
+            return float(self.hass.states.get(self._pv_production_entity).state) <= 0
+        except (ValueError, AttributeError):
+            return False
@@ -0,0 +1,177 @@
+"""Streaming export of controller decisions to rotating files."""
+
+from __future__ import annotations
+
+import asyncio
+import csv
+from datetime import datetime, timedelta
+import gzip
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+_LOGGER = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ["off", "csv", "jsonl"]
+
+EXPORT_DIRECTORY = "solmate_exports"
+FLUSH_INTERVAL = timedelta(seconds=10)
+FLUSH_BATCH_SIZE = 500
+MAX_FILE_BYTES = 10 * 1024 * 1024
+MAX_FILE_AGE = timedelta(days=1)
+
+CSV_COLUMNS = [
+    "timestamp",
+    "kind",
+    "consumption",
+    "production",
+    "home_battery_soc",
+    "surplus",
+    "target_amps",
+    "actual_amps",
+    "state",
+    "command",
+    "event",
+    "source",
+    "target",
+]
+
+
+class DecisionExporter:
+    """Buffers controller records and appends them to files in the executor."""
+
+    def __init__(self, hass: HomeAssistant, directory: str, export_format: str) -> None:
+        """Initialize the exporter."""
+        self._hass = hass
+        self._directory = directory
+        self._format = export_format
+        self._buffer: list[dict[str, Any]] = []
+        self._flush_task: asyncio.Task | None = None
+        self._unsub_interval = None
+
+        # Only touched from the executor, one batch at a time.
+        self._file = None
+        self._file_path: str | None = None
+        self._file_opened = 0.0
+
+    def start(self) -> None:
+        """Start the periodic flush."""
+
+        @callback
+        def _interval_flush(now: datetime) -> None:
+            self._schedule_flush()
+
+        self._unsub_interval = async_track_time_interval(
+            self._hass, _interval_flush, FLUSH_INTERVAL
+        )
+
+    def stop(self) -> None:
+        """Stop the exporter and write out what is still buffered."""
+        if self._unsub_interval:
+            self._unsub_interval()
+            self._unsub_interval = None
+        self._hass.async_create_task(self._async_flush(close=True))
+
+    def record_decision(self, **values: Any) -> None:
+        """Buffer a controller evaluation."""
+        self._add({"timestamp": time.time(), "kind": "decision", **values})
+
+    def after_transition(self, event, source, target):
+        """Buffer a state machine transition."""
+        self._add(
+            {
+                "timestamp": time.time(),
+                "kind": "transition",
+                "event": event,
+                "source": source.id,
+                "target": target.id,
+            }
+        )
+
+    def _add(self, row: dict[str, Any]) -> None:
+        self._buffer.append(row)
+        if len(self._buffer) >= FLUSH_BATCH_SIZE:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        """Start a flush unless one is already in flight."""
+        if self._buffer and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = self._hass.async_create_background_task(
+                self._async_flush(), "solmate decision export"
+            )
+
+    async def _async_flush(self, close: bool = False) -> None:
+        if self._flush_task and not self._flush_task.done() and close:
+            await self._flush_task
+        rows, self._buffer = self._buffer, []
+        try:
+            await self._hass.async_add_executor_job(self._write_batch, rows, close)
+        except OSError as err:
+            _LOGGER.error("Can't export decisions to %s: %s", self._directory, err)
+
+    def _write_batch(self, rows: list[dict[str, Any]], close: bool) -> None:
+        """Write a batch of rows, rotating the file when needed."""
+        if self._file is None:
+            os.makedirs(self._directory, exist_ok=True)
+            self._compress_leftovers()
+
+        if rows:
+            if self._file is not None and (
+                self._file.tell() >= MAX_FILE_BYTES
+                or time.time() - self._file_opened >= MAX_FILE_AGE.total_seconds()
+            ):
+                self._close_file()
+            if self._file is None:
+                self._open_file()
+
+            if self._format == "csv":
+                writer = csv.DictWriter(
+                    self._file, fieldnames=CSV_COLUMNS, extrasaction="ignore"
+                )
+                writer.writerows(rows)
+            else:
+                self._file.writelines(json.dumps(row) + "\n" for row in rows)
+            self._file.flush()
+
+        if close:
+            self._close_file()
+
+    def _open_file(self) -> None:
+        self._file_opened = time.time()
+        name = datetime.fromtimestamp(self._file_opened).strftime("%Y%m%d-%H%M%S")
+        self._file_path = os.path.join(
+            self._directory, f"decisions-{name}.{self._format}"
+        )
+        # Kept open across flushes until rotation or stop, which close it.
+        self._file = open(  # noqa: SIM115
+            self._file_path, "a", encoding="utf-8", newline=""
+        )
+        if self._format == "csv":
+            csv.writer(self._file).writerow(CSV_COLUMNS)
+
+    def _close_file(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        _compress(self._file_path)
+        self._file_path = None
+
+    def _compress_leftovers(self) -> None:
+        """Compress files left open by a previous run."""
+        for name in os.listdir(self._directory):
+            if name.endswith((".csv", ".jsonl")):
+                _compress(os.path.join(self._directory, name))
+
+
+def _compress(path: str) -> None:
+    """Gzip a closed export file and remove the original."""
+    with open(path, "rb") as src, gzip.open(f"{path}.gz", "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(path)
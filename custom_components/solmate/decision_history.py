@@ -0,0 +1,193 @@
+"""Compact in-memory history of controller decisions."""
+
+from __future__ import annotations
+
+from array import array
+import math
+from typing import Any
+
+DEFAULT_DECISION_CAPACITY = 3600
+DEFAULT_MINUTE_CAPACITY = 1440
+
+
+class _RingColumns:
+    """Fixed size ring buffer made of typed array columns."""
+
+    def __init__(self, capacity: int, columns: dict[str, str]) -> None:
+        """Initialize the columns."""
+        self._capacity = capacity
+        self._columns = {
+            name: array(typecode, [0] * capacity) for name, typecode in columns.items()
+        }
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Return the number of stored rows."""
+        return self._size
+
+    def append(self, **values: float) -> None:
+        """Append a row, overwriting the oldest one when full."""
+        for name, column in self._columns.items():
+            column[self._next] = values[name]
+        self._next = (self._next + 1) % self._capacity
+        self._size = min(self._size + 1, self._capacity)
+
+    def rows(self) -> list[dict[str, float]]:
+        """Return the stored rows, oldest first."""
+        start = (self._next - self._size) % self._capacity
+        return [
+            {
+                name: column[(start + i) % self._capacity]
+                for name, column in self._columns.items()
+            }
+            for i in range(self._size)
+        ]
+
+
+class DecisionHistory:
+    """Keeps the last decisions and per-minute aggregates of older ones."""
+
+    def __init__(
+        self,
+        states: list[str],
+        capacity: int = DEFAULT_DECISION_CAPACITY,
+        minute_capacity: int = DEFAULT_MINUTE_CAPACITY,
+    ) -> None:
+        """Initialize the history."""
+        self._states = states
+        self._state_index = {state: index for index, state in enumerate(states)}
+        self._decisions = _RingColumns(
+            capacity,
+            {
+                "timestamp": "d",
+                "surplus": "f",
+                "target_amps": "h",
+                "actual_amps": "f",
+                "state": "B",
+            },
+        )
+        self._minutes = _RingColumns(
+            minute_capacity,
+            {
+                "minute": "d",
+                "count": "I",
+                "surplus_min": "f",
+                "surplus_max": "f",
+                "surplus_mean": "f",
+                "target_amps_min": "h",
+                "target_amps_max": "h",
+                "target_amps_mean": "f",
+                "actual_amps_min": "f",
+                "actual_amps_max": "f",
+                "actual_amps_mean": "f",
+                "state": "B",
+            },
+        )
+        self._bucket: dict[str, float] | None = None
+
+    def record(
+        self,
+        timestamp: float,
+        surplus: float,
+        target_amps: int,
+        actual_amps: float,
+        state: str,
+    ) -> None:
+        """Record a decision."""
+        state_index = self._state_index.get(state, 0)
+        self._decisions.append(
+            timestamp=timestamp,
+            surplus=surplus,
+            target_amps=target_amps,
+            actual_amps=actual_amps,
+            state=state_index,
+        )
+
+        minute = math.floor(timestamp / 60) * 60
+        bucket = self._bucket
+        if bucket is not None and bucket["minute"] != minute:
+            self._close_bucket()
+            bucket = None
+        if bucket is None:
+            self._bucket = {
+                "minute": minute,
+                "count": 1,
+                "surplus_min": surplus,
+                "surplus_max": surplus,
+                "surplus_sum": surplus,
+                "target_amps_min": target_amps,
+                "target_amps_max": target_amps,
+                "target_amps_sum": target_amps,
+                "actual_amps_min": actual_amps,
+                "actual_amps_max": actual_amps,
+                "actual_amps_sum": actual_amps,
+                "state": state_index,
+            }
+            return
+
+        bucket["count"] += 1
+        for name, value in (
+            ("surplus", surplus),
+            ("target_amps", target_amps),
+            ("actual_amps", actual_amps),
+        ):
+            bucket[f"{name}_min"] = min(bucket[f"{name}_min"], value)
+            bucket[f"{name}_max"] = max(bucket[f"{name}_max"], value)
+            bucket[f"{name}_sum"] += value
+        bucket["state"] = state_index
+
+    def _close_bucket(self) -> None:
+        """Move the open minute bucket into the minute ring."""
+        self._minutes.append(**self._bucket_row(self._bucket))
+        self._bucket = None
+
+    @staticmethod
+    def _bucket_row(bucket: dict[str, float]) -> dict[str, float]:
+        """Return the aggregates of a minute bucket."""
+        count = bucket["count"]
+        return {
+            "minute": bucket["minute"],
+            "count": count,
+            "surplus_min": bucket["surplus_min"],
+            "surplus_max": bucket["surplus_max"],
+            "surplus_mean": bucket["surplus_sum"] / count,
+            "target_amps_min": bucket["target_amps_min"],
+            "target_amps_max": bucket["target_amps_max"],
+            "target_amps_mean": bucket["target_amps_sum"] / count,
+            "actual_amps_min": bucket["actual_amps_min"],
+            "actual_amps_max": bucket["actual_amps_max"],
+            "actual_amps_mean": bucket["actual_amps_sum"] / count,
+            "state": bucket["state"],
+        }
+
+    def _with_state_names(self, rows: list[dict[str, float]]) -> list[dict[str, Any]]:
+        for row in rows:
+            row["state"] = self._states[int(row["state"])]
+        return rows
+
+    def decisions(self, since: float | None = None) -> list[dict[str, Any]]:
+        """Return the recent decisions, oldest first."""
+        rows = self._decisions.rows()
+        if since is not None:
+            rows = [row for row in rows if row["timestamp"] >= since]
+        return self._with_state_names(rows)
+
+    def minutes(self, since: float | None = None) -> list[dict[str, Any]]:
+        """Return the per-minute aggregates, oldest first.
+
+        The last row is the current minute, aggregated so far.
+        """
+        rows = self._minutes.rows()
+        if self._bucket is not None:
+            rows.append(self._bucket_row(self._bucket))
+        if since is not None:
+            rows = [row for row in rows if row["minute"] >= since]
+        return self._with_state_names(rows)
+
+    def as_dict(self, since: float | None = None) -> dict[str, Any]:
+        """Return the history as a serializable dict."""
+        return {
+            "decisions": self.decisions(since),
+            "minutes": self.minutes(since),
+        }
@@ -0,0 +1,23 @@
+"""Diagnostics support for solmate."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from . import SolmateConfigEntry
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: SolmateConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    controller = entry.runtime_data
+    return {
+        "options": dict(entry.options),
+        "state": controller.state,
+        "decision_history": controller.history.as_dict(),
+        "trace": controller.trace_buffer.dump(),
+        "charge_plan": controller.planner.as_dict() if controller.planner else None,
+    }
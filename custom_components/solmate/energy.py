@@ -0,0 +1,128 @@
+"""Solar and grid energy delivered to the car."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+STORAGE_VERSION = 1
+SAVE_DELAY = 60
+CHARGER_VOLTAGE = 240
+
+ENERGY_KEYS = ("session_solar", "session_grid", "lifetime_solar", "lifetime_grid")
+
+
+class EnergyAccounting:
+    """Integrates car charging power into solar and grid energy totals.
+
+    Each sample costs O(1): the power drawn by the car since the previous
+    sample is integrated with the trapezoidal rule. Like the controller, it
+    takes the home consumption to exclude the car, so the car is solar powered
+    up to the PV production not used by the rest of the home.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, entry_id: str, persist: bool = True
+    ) -> None:
+        """Initialize the accounting."""
+        self._store: Store[dict[str, Any]] | None = None
+        if persist:
+            self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}_energy_{entry_id}")
+        self.totals = dict.fromkeys(ENERGY_KEYS, 0.0)
+        self.session_start: datetime | None = None
+        self._last_sample: tuple[float, float, float] | None = None
+        self._listeners: list[Callable[[], None]] = []
+        self._save_pending = False
+
+    async def async_load(self) -> None:
+        """Load the persisted totals."""
+        if self._store and (data := await self._store.async_load()):
+            for key in ENERGY_KEYS:
+                self.totals[key] = data.get(key, 0.0)
+            if session_start := data.get("session_start"):
+                self.session_start = dt_util.parse_datetime(session_start)
+
+    async def async_save(self) -> None:
+        """Write the totals now, replacing any pending delayed write."""
+        if self._store:
+            await self._store.async_save(self._data_to_save())
+
+    @callback
+    def async_add_listener(self, listener: Callable[[], None]) -> CALLBACK_TYPE:
+        """Call listener whenever the totals change, return a remover."""
+        self._listeners.append(listener)
+
+        @callback
+        def remove() -> None:
+            self._listeners.remove(listener)
+
+        return remove
+
+    @callback
+    def start_session(self) -> None:
+        """Reset the session totals."""
+        self.totals["session_solar"] = 0.0
+        self.totals["session_grid"] = 0.0
+        self.session_start = dt_util.utcnow()
+        self._changed()
+
+    @callback
+    def add_sample(
+        self,
+        timestamp: float,
+        charging_amps: float,
+        production: float,
+        consumption: float,
+    ) -> None:
+        """Integrate the power drawn by the car up to timestamp."""
+        car_power = max(0.0, charging_amps * CHARGER_VOLTAGE)
+        solar_power = min(car_power, max(0.0, production - consumption))
+        grid_power = car_power - solar_power
+
+        last_sample = self._last_sample
+        self._last_sample = (timestamp, solar_power, grid_power)
+        if last_sample is None:
+            return
+        last_timestamp, last_solar_power, last_grid_power = last_sample
+        hours = (timestamp - last_timestamp) / 3600
+        if hours <= 0 or (car_power == 0 and last_solar_power + last_grid_power == 0):
+            return
+
+        solar_kwh = (last_solar_power + solar_power) / 2 * hours / 1000
+        grid_kwh = (last_grid_power + grid_power) / 2 * hours / 1000
+        self.totals["session_solar"] += solar_kwh
+        self.totals["lifetime_solar"] += solar_kwh
+        self.totals["session_grid"] += grid_kwh
+        self.totals["lifetime_grid"] += grid_kwh
+        self._changed()
+
+    def _changed(self) -> None:
+        # Restarting the delay on every sample would postpone the write for
+        # as long as the car charges.
+        if self._store and not self._save_pending:
+            self._save_pending = True
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        for listener in self._listeners:
+            listener()
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        self._save_pending = False
+        return {
+            **self.totals,
+            "session_start": self.session_start.isoformat()
+            if self.session_start
+            else None,
+        }
+
+    def on_enter_state(self, source, target):
+        """Start a new session when charging starts."""
+        if target.id == "charging_warmup" and source != target:
+            self.start_session()
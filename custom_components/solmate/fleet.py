@@ -0,0 +1,92 @@
+"""Integration-wide state change dispatcher shared by all solmate entries."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+import logging
+
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import (
+    CALLBACK_TYPE,
+    Event,
+    EventStateChangedData,
+    HomeAssistant,
+    callback,
+)
+
+from .const import DATA_FLEET_DISPATCHER
+
+_LOGGER = logging.getLogger(__name__)
+
+StateChangedAction = Callable[[Event[EventStateChangedData]], None]
+
+
+class FleetDispatcher:
+    """Subscribes to state changes once and routes them by entity id.
+
+    Each event costs one dict lookup no matter how many config entries are
+    loaded; only the actions tracking the changed entity are called.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the dispatcher."""
+        self._hass = hass
+        self._index: dict[str, list[StateChangedAction]] = {}
+        self._unsub_listener: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_track(
+        self, entity_ids: Iterable[str], action: StateChangedAction
+    ) -> CALLBACK_TYPE:
+        """Call action on state changes of entity_ids, return a remover."""
+        entity_ids = set(entity_ids)
+        # The action lists are copied on write so dispatching never has to
+        # copy them to survive an action removing itself.
+        for entity_id in entity_ids:
+            self._index[entity_id] = [*self._index.get(entity_id, ()), action]
+
+        if self._unsub_listener is None:
+            self._unsub_listener = self._hass.bus.async_listen(
+                EVENT_STATE_CHANGED, self._async_dispatch, event_filter=self._filter
+            )
+
+        @callback
+        def remove() -> None:
+            for entity_id in entity_ids:
+                actions = [
+                    tracked
+                    for tracked in self._index.get(entity_id, ())
+                    if tracked is not action
+                ]
+                if actions:
+                    self._index[entity_id] = actions
+                else:
+                    self._index.pop(entity_id, None)
+            if not self._index and self._unsub_listener:
+                self._unsub_listener()
+                self._unsub_listener = None
+
+        return remove
+
+    @callback
+    def _filter(self, event_data: EventStateChangedData) -> bool:
+        return event_data["entity_id"] in self._index
+
+    @callback
+    def _async_dispatch(self, event: Event[EventStateChangedData]) -> None:
+        for action in self._index.get(event.data["entity_id"], ()):
+            # One entry failing must not keep the others from seeing the event.
+            try:
+                action(event)
+            except Exception:
+                _LOGGER.exception(
+                    "Error handling state change of %s", event.data["entity_id"]
+                )
+
+
+@callback
+def async_get_fleet_dispatcher(hass: HomeAssistant) -> FleetDispatcher:
+    """Return the dispatcher shared by all solmate entries."""
+    if (dispatcher := hass.data.get(DATA_FLEET_DISPATCHER)) is None:
+        dispatcher = hass.data[DATA_FLEET_DISPATCHER] = FleetDispatcher(hass)
+    return dispatcher
@@ -0,0 +1,284 @@
+"""Day-ahead charge planning from a PV forecast."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import logging
+from typing import Any
+
+import numpy as np
+
+from homeassistant.core import HomeAssistant, State, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, MAX_CHARGING_AMPS, MIN_CHARGING_AMPS
+from .energy import CHARGER_VOLTAGE
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+SAVE_DELAY = 300
+
+SLOT = timedelta(minutes=15)
+SLOTS_PER_DAY = 96
+# Weight of today's consumption when blending it into the profile.
+PROFILE_WEIGHT = 0.3
+# Production/forecast ratio change that triggers a re-plan.
+REPLAN_RATIO_CHANGE = 0.1
+# Production below this many watts is too small to correct the forecast.
+MIN_FORECAST_WATTS = 100.0
+
+SLOT_KWH_PER_AMP = CHARGER_VOLTAGE * SLOT.total_seconds() / 3600 / 1000
+
+
+def parse_forecast(state: State | None) -> tuple[np.ndarray, np.ndarray] | None:
+    """Return forecast timestamps and watts from a forecast entity.
+
+    Supports the Solcast ``detailedForecast`` attribute (period_start,
+    pv_estimate in kW) and the ``watts`` attribute (timestamp -> W) used by
+    Forecast.Solar style integrations.
+    """
+    if state is None:
+        return None
+    points: list[tuple[float, float]] = []
+    if detailed := state.attributes.get("detailedForecast"):
+        for period in detailed:
+            start = period["period_start"]
+            if isinstance(start, str):
+                start = dt_util.parse_datetime(start)
+            points.append((start.timestamp(), float(period["pv_estimate"]) * 1000))
+    elif watts := state.attributes.get("watts"):
+        for start, value in watts.items():
+            if isinstance(start, str):
+                start = dt_util.parse_datetime(start)
+            points.append((start.timestamp(), float(value)))
+    if not points:
+        return None
+    points.sort()
+    timestamps, values = zip(*points, strict=True)
+    return np.array(timestamps), np.array(values)
+
+
+class ChargePlanner:
+    """Plans per-slot charging amps for the rest of the day.
+
+    The plan combines the PV forecast, a per time-of-day profile of the home
+    consumption without the car, and the energy still needed to reach the
+    daily target. When the solar surplus alone can't deliver it, the slots
+    with the best surplus get a floor on the charging amps so small morning
+    surpluses are used instead of leaving the rest to the grid at night.
+    Once the target is reached only the solar surplus drives charging again.
+
+    The plan is only recomputed when a slot starts, the forecast changes or
+    the actual production drifts away from the forecast.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry_id: str,
+        forecast_entity: str,
+        target_energy: float,
+        power_buffer: float,
+    ) -> None:
+        """Initialize the planner."""
+        self._hass = hass
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}_planner_{entry_id}"
+        )
+        self._forecast_entity = forecast_entity
+        self.target_energy = target_energy
+        self.power_buffer = power_buffer
+
+        self._profile = np.full(SLOTS_PER_DAY, np.nan)
+        self._day: str | None = None
+        self._day_start_energy: float | None = None
+        self._delivered_today = 0.0
+
+        self._slot_index = -1
+        self._slot_consumption = 0.0
+        self._slot_production = 0.0
+        self._slot_samples = 0
+
+        self._forecast: tuple[np.ndarray, np.ndarray] | None = None
+        self._forecast_updated: datetime | None = None
+        self._ratio = 1.0
+        self._planned_ratio = 1.0
+        self._plan_start: datetime | None = None
+        self._plan_floor = np.zeros(0)
+        self._dirty = True
+
+    @callback
+    def update_parameters(self, target_energy: float, power_buffer: float) -> None:
+        """Change the daily target and power buffer, re-planning on next use."""
+        self.target_energy = target_energy
+        self.power_buffer = power_buffer
+        self._dirty = True
+
+    async def async_load(self) -> None:
+        """Load the consumption profile."""
+        if data := await self._store.async_load():
+            self._profile = np.array(
+                [np.nan if value is None else value for value in data["profile"]]
+            )
+            self._day = data.get("day")
+            self._day_start_energy = data.get("day_start_energy")
+
+    async def async_save(self) -> None:
+        """Write the profile now, replacing any pending delayed write."""
+        await self._store.async_save(self._data_to_save())
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        return {
+            "profile": [None if np.isnan(value) else value for value in self._profile],
+            "day": self._day,
+            "day_start_energy": self._day_start_energy,
+        }
+
+    @callback
+    def add_sample(
+        self,
+        now: datetime,
+        production: float,
+        consumption: float,
+        delivered_energy: float,
+    ) -> None:
+        """Learn from a sample and note whether the plan needs updating.
+
+        delivered_energy is the lifetime energy delivered to the car in kWh.
+        """
+        local = dt_util.as_local(now)
+        day = local.date().isoformat()
+        if day != self._day or self._day_start_energy is None:
+            self._day = day
+            self._day_start_energy = delivered_energy
+            self._dirty = True
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        self._delivered_today = delivered_energy - self._day_start_energy
+
+        slot_index = (local.hour * 60 + local.minute) // 15
+        if slot_index != self._slot_index:
+            self._close_slot()
+            self._slot_index = slot_index
+            self._dirty = True
+
+        # Like the controller's surplus, the consumption excludes the car.
+        self._slot_consumption += consumption
+        self._slot_production += production
+        self._slot_samples += 1
+
+        if (state := self._hass.states.get(self._forecast_entity)) is not None and (
+            state.last_updated != self._forecast_updated
+        ):
+            # Remember the state even if it can't be parsed, so a malformed
+            # forecast is only reported once.
+            self._forecast_updated = state.last_updated
+            try:
+                self._forecast = parse_forecast(state)
+            except (KeyError, TypeError, ValueError, AttributeError) as err:
+                _LOGGER.warning(
+                    "Can't parse the PV forecast of %s: %s", self._forecast_entity, err
+                )
+                self._forecast = None
+            self._dirty = True
+
+        if self._forecast is not None:
+            forecast = float(np.interp(now.timestamp(), *self._forecast))
+            if forecast >= MIN_FORECAST_WATTS:
+                observed = self._slot_production / self._slot_samples
+                self._ratio = min(2.0, observed / forecast)
+                if abs(self._ratio - self._planned_ratio) > REPLAN_RATIO_CHANGE:
+                    self._dirty = True
+
+    def _close_slot(self) -> None:
+        """Blend the finished slot's consumption into the profile."""
+        if self._slot_samples and self._slot_index >= 0:
+            mean = self._slot_consumption / self._slot_samples
+            previous = self._profile[self._slot_index]
+            self._profile[self._slot_index] = (
+                mean
+                if np.isnan(previous)
+                else (1 - PROFILE_WEIGHT) * previous + PROFILE_WEIGHT * mean
+            )
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        self._slot_consumption = 0.0
+        self._slot_production = 0.0
+        self._slot_samples = 0
+
+    @staticmethod
+    def slot_start(now: datetime) -> datetime:
+        """Return the local start of the slot now falls in."""
+        local = dt_util.as_local(now)
+        return local.replace(
+            minute=local.minute - local.minute % 15, second=0, microsecond=0
+        )
+
+    def _replan(self, now: datetime) -> None:
+        """Compute the floor amps for the remaining slots of the day."""
+        self._dirty = False
+        self._planned_ratio = self._ratio
+        self._plan_start = self.slot_start(now)
+        slots = SLOTS_PER_DAY - self._slot_index
+        starts = self._plan_start.timestamp() + np.arange(slots) * SLOT.total_seconds()
+        middles = starts + SLOT.total_seconds() / 2
+
+        pv = np.interp(middles, *self._forecast, left=0.0, right=0.0) * self._ratio
+        consumption = self._profile[self._slot_index :]
+        known = consumption[~np.isnan(consumption)]
+        fallback = known.mean() if known.size else 0.0
+        consumption = np.where(np.isnan(consumption), fallback, consumption)
+
+        surplus = pv - consumption - self.power_buffer
+        solar_amps = np.clip(surplus / CHARGER_VOLTAGE, 0, MAX_CHARGING_AMPS)
+        solar_amps = np.where(solar_amps >= MIN_CHARGING_AMPS, solar_amps, 0.0)
+
+        floor = np.zeros(slots)
+        needed = self.target_energy - self._delivered_today
+        deficit = needed - solar_amps.sum() * SLOT_KWH_PER_AMP
+        if deficit > 0:
+            # Charge at the minimum in the slots with the most surplus that
+            # can't start charging on solar alone.
+            order = np.argsort(-surplus)
+            candidates = order[solar_amps[order] == 0]
+            gained = np.cumsum(np.full(candidates.size, MIN_CHARGING_AMPS))
+            count = int(np.searchsorted(gained * SLOT_KWH_PER_AMP, deficit)) + 1
+            chosen = candidates[:count]
+            floor[chosen] = MIN_CHARGING_AMPS
+            deficit -= (
+                min(count, candidates.size) * MIN_CHARGING_AMPS * SLOT_KWH_PER_AMP
+            )
+            if deficit > 0:
+                # Still short: fill the slots with the most surplus up to the
+                # maximum amps, best first.
+                floor = np.maximum(floor, solar_amps)
+                headroom = (MAX_CHARGING_AMPS - floor[order]) * SLOT_KWH_PER_AMP
+                before = np.cumsum(headroom) - headroom
+                extra = np.clip(deficit - before, 0, headroom) / SLOT_KWH_PER_AMP
+                floor[order] += extra
+        self._plan_floor = np.ceil(floor)
+
+    @callback
+    def floor_amps(self, now: datetime) -> int:
+        """Return the minimum target amps the plan asks for now."""
+        if self._forecast is None or self._slot_index < 0:
+            return 0
+        if self._delivered_today >= self.target_energy:
+            return 0
+        if self._dirty:
+            self._replan(now)
+        index = int((now - self._plan_start).total_seconds() // SLOT.total_seconds())
+        if 0 <= index < self._plan_floor.size:
+            return int(self._plan_floor[index])
+        return 0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the current plan."""
+        return {
+            "target_energy": self.target_energy,
+            "delivered_today": self._delivered_today,
+            "forecast_ratio": self._ratio,
+            "plan_start": self._plan_start.isoformat() if self._plan_start else None,
+            "floor_amps": self._plan_floor.tolist(),
+        }
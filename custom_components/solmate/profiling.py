@@ -0,0 +1,91 @@
+"""On-demand profiling of the solmate hot path."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+import cProfile
+import functools
+import io
+import pstats
+from typing import Any, TypeVar
+
+_FuncT = TypeVar("_FuncT", bound=Callable[..., Any])
+
+
+class Profiler:
+    """Profiles calls to functions decorated with ``profiled`` while active."""
+
+    def __init__(self) -> None:
+        """Initialize the profiler."""
+        self._profile: cProfile.Profile | None = None
+        self._depth = 0
+
+    @property
+    def active(self) -> bool:
+        """Return True while a profiling session is running."""
+        return self._profile is not None
+
+    def start(self) -> None:
+        """Start a profiling session."""
+        if self._profile is not None:
+            raise ValueError("Profiler already started")
+        profile = cProfile.Profile()
+        # Since Python 3.12 only one profiler can be enabled at a time.
+        try:
+            profile.enable()
+        except ValueError as err:
+            raise ValueError("Another profiler is active") from err
+        profile.disable()
+        self._profile = profile
+
+    def stop(self) -> cProfile.Profile:
+        """Stop the profiling session and return the collected profile."""
+        profile, self._profile = self._profile, None
+        if profile is None:
+            raise ValueError("Profiler not started")
+        return profile
+
+    def call(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Call func, profiling it if a session is running."""
+        profile = self._profile
+        # Nested profiled calls are already covered by the outermost one.
+        if profile is None or self._depth:
+            return func(*args, **kwargs)
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler was enabled since the session started.
+            return func(*args, **kwargs)
+        self._depth += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            self._depth -= 1
+
+
+PROFILER = Profiler()
+
+
+def profiled(func: _FuncT) -> _FuncT:
+    """Decorate a function so it is profiled during a profiling session."""
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if PROFILER.active:
+            return PROFILER.call(func, *args, **kwargs)
+        return func(*args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def write_profile(profile: cProfile.Profile, path: str, top: int) -> tuple[str, float]:
+    """Write the profile to path and return a top-N summary and total time.
+
+    The stats file can be opened with pstats, snakeviz or flameprof.
+    """
+    profile.dump_stats(path)
+    stream = io.StringIO()
+    stats = pstats.Stats(profile, stream=stream)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+    return stream.getvalue(), stats.total_tt
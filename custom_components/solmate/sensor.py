@@ -8,34 +8,49 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import UnitOfPower
+from homeassistant.const import UnitOfEnergy, UnitOfPower
 from homeassistant.core import Event, EventStateChangedData, HomeAssistant, callback
 from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.event import async_track_state_change_event
 
+from . import SolmateConfigEntry
 from .const import DOMAIN
+from .energy import EnergyAccounting
+from .fleet import async_get_fleet_dispatcher
+from .profiling import profiled
 from .solmate_controller import SolmateController
 
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(
-    hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
+    hass: HomeAssistant,
+    entry: SolmateConfigEntry,
+    async_add_entities: AddEntitiesCallback,
 ):
     """Set up the sensor platform."""
+    controller = entry.runtime_data
     async_add_entities(
         [
-            SolmateControllerSensor(hass, entry),
+            SolmateControllerSensor(hass, entry, controller),
             SurplusPowerSensor(
                 hass,
                 entry.entry_id,
                 entry.options["home_consumption_entity"],
                 entry.options["pv_production_entity"],
-                entry.options["power_buffer"],
+                controller,
                 entry.options["charger_switch_entity"],
                 entry.options["charger_current_charging_amps_entity"],
             ),
+            *(
+                SolmateEnergySensor(entry, controller.energy, key, name)
+                for key, name in (
+                    ("session_solar", "Session Solar Energy"),
+                    ("session_grid", "Session Grid Energy"),
+                    ("lifetime_solar", "Solar Energy"),
+                    ("lifetime_grid", "Grid Energy"),
+                )
+            ),
         ]
     )
 
@@ -48,21 +63,29 @@ class SolmateControllerSensor(SensorEntity):
     _attr_native_unit_of_measurement = UnitOfPower.WATT
     _attr_has_entity_name = True
     _attr_name = "Solmate Controller"
-    _attr_unique_id = "solmate_controller"
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+    def __init__(
+        self, hass: HomeAssistant, entry: ConfigEntry, controller: SolmateController
+    ) -> None:
         """Initialize the sensor."""
+        self._attr_unique_id = f"{entry.entry_id}_controller"
         self._attr_device_info = DeviceInfo(
             name="Solmate",
             identifiers={(DOMAIN, entry.entry_id)},
             entry_type=DeviceEntryType.SERVICE,
         )
-        self._controller = SolmateController(hass, entry)
+        self._controller = controller
 
     async def async_added_to_hass(self) -> None:
         """Handle entity which will be added."""
-        self.async_on_remove(self._controller.stop())
-        self._controller.start()
+        self.async_on_remove(
+            self._controller.timings.async_add_listener(self.async_write_ha_state)
+        )
+
+    @property
+    def extra_state_attributes(self):
+        """Return the debounce timings currently in use."""
+        return self._controller.timings.as_dict()
 
 
 class SurplusPowerSensor(SensorEntity):
@@ -73,7 +96,6 @@ class SurplusPowerSensor(SensorEntity):
     _attr_native_unit_of_measurement = UnitOfPower.WATT
     _attr_has_entity_name = True
     _attr_name = "Surplus Power"
-    _attr_unique_id = "solmate_surplus_power"
 
     def __init__(
         self,
@@ -81,15 +103,16 @@ class SurplusPowerSensor(SensorEntity):
         entry_id: str,
         home_consumption_entity: str,
         pv_production_entity: str,
-        power_buffer: int,
+        controller: SolmateController,
         charger_switch_entity: str,
         charger_current_charging_amps_entity: str,
     ) -> None:
         """Initialize the sensor."""
         self._hass = hass
+        self._attr_unique_id = f"{entry_id}_surplus_power"
         self._home_consumption_entity = home_consumption_entity
         self._pv_production_entity = pv_production_entity
-        self._power_buffer = power_buffer
+        self._controller = controller
         self._charger_switch_entity = charger_switch_entity
         self._charger_current_charging_amps_entity = (
             charger_current_charging_amps_entity
@@ -105,13 +128,13 @@ class SurplusPowerSensor(SensorEntity):
         """Handle entity which will be added."""
 
         @callback
+        @profiled
         def async_state_changed_listener(event: Event[EventStateChangedData]):
             """Handle state changes."""
             self.async_schedule_update_ha_state(True)
 
         self.async_on_remove(
-            async_track_state_change_event(
-                self._hass,
+            async_get_fleet_dispatcher(self._hass).async_track(
                 [
                     self._home_consumption_entity,
                     self._pv_production_entity,
@@ -119,8 +142,15 @@ class SurplusPowerSensor(SensorEntity):
                 async_state_changed_listener,
             )
         )
+        # The power buffer can change without reloading the entry.
+        self.async_on_remove(
+            self._controller.async_add_options_listener(
+                lambda: self.async_schedule_update_ha_state(True)
+            )
+        )
 
     @property
+    @profiled
     def native_value(self):
         """Return the surplus power value."""
         try:
@@ -129,9 +159,62 @@ class SurplusPowerSensor(SensorEntity):
             )
             production = float(self._hass.states.get(self._pv_production_entity).state)
 
-            surplus = production - consumption - self._power_buffer
+            surplus = production - consumption - self._controller.power_buffer
             return max(0, round(surplus))  # Don't return negative surplus
 
         except (ValueError, AttributeError) as err:
             _LOGGER.error("Error calculating surplus power: %s", err)
             return None
+
+
+class SolmateEnergySensor(SensorEntity):
+    """Energy delivered to the car."""
+
+    _attr_device_class = SensorDeviceClass.ENERGY
+    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+    _attr_suggested_display_precision = 2
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+
+    def __init__(
+        self, entry: ConfigEntry, energy: EnergyAccounting, key: str, name: str
+    ) -> None:
+        """Initialize the sensor."""
+        self._energy = energy
+        self._key = key
+        self._attr_name = name
+        self._attr_unique_id = f"{entry.entry_id}_{key}_energy"
+        self._attr_device_info = DeviceInfo(
+            name="Solmate",
+            identifiers={(DOMAIN, entry.entry_id)},
+            entry_type=DeviceEntryType.SERVICE,
+        )
+        if key.startswith("session_"):
+            self._attr_state_class = SensorStateClass.TOTAL
+        else:
+            self._attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    async def async_added_to_hass(self) -> None:
+        """Handle entity which will be added."""
+
+        @callback
+        def async_energy_changed() -> None:
+            """Write the state when the rounded value changed."""
+            if self.native_value != self._written_value:
+                self._written_value = self.native_value
+                self.async_write_ha_state()
+
+        self._written_value = self.native_value
+        self.async_on_remove(self._energy.async_add_listener(async_energy_changed))
+
+    @property
+    def native_value(self):
+        """Return the energy in kWh."""
+        return round(self._energy.totals[self._key], 3)
+
+    @property
+    def last_reset(self):
+        """Return the start of the session for session totals."""
+        if self._attr_state_class == SensorStateClass.TOTAL:
+            return self._energy.session_start
+        return None
@@ -0,0 +1,115 @@
+"""Services for the solmate integration."""
+
+from __future__ import annotations
+
+import asyncio
+
+import voluptuous as vol
+
+from homeassistant.components import persistent_notification
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+from .profiling import PROFILER, write_profile
+
+SERVICE_GET_DECISION_HISTORY = "get_decision_history"
+SERVICE_PROFILE = "profile"
+
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_SINCE = "since"
+ATTR_DURATION = "duration"
+ATTR_TOP = "top"
+
+GET_DECISION_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_SINCE): cv.datetime,
+    }
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DURATION, default=60): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=3600)
+        ),
+        vol.Optional(ATTR_TOP, default=20): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=200)
+        ),
+    }
+)
+
+
+def _get_controllers(hass: HomeAssistant, call: ServiceCall) -> dict:
+    """Return the controllers targeted by a service call."""
+    controllers = {
+        entry.entry_id: entry.runtime_data
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if entry.state is ConfigEntryState.LOADED
+    }
+    if entry_id := call.data.get(ATTR_CONFIG_ENTRY_ID):
+        if entry_id not in controllers:
+            raise ServiceValidationError(f"Unknown solmate config entry: {entry_id}")
+        return {entry_id: controllers[entry_id]}
+    return controllers
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the solmate services."""
+
+    async def async_get_decision_history(call: ServiceCall) -> ServiceResponse:
+        """Return the recent controller decisions."""
+        since = call.data.get(ATTR_SINCE)
+        # The datetime selector gives a naive time in the Home Assistant zone.
+        since_ts = dt_util.as_utc(since).timestamp() if since else None
+        return {
+            entry_id: controller.history.as_dict(since_ts)
+            for entry_id, controller in _get_controllers(hass, call).items()
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_DECISION_HISTORY,
+        async_get_decision_history,
+        schema=GET_DECISION_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    async def async_profile(call: ServiceCall) -> None:
+        """Profile the solmate hot path for a while and report the results."""
+        duration = call.data[ATTR_DURATION]
+        try:
+            PROFILER.start()
+        except ValueError as err:
+            raise HomeAssistantError(f"Can't start a solmate profile: {err}") from err
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            profile = PROFILER.stop()
+
+        path = hass.config.path(
+            f"solmate_profile_{dt_util.now().strftime('%Y%m%d-%H%M%S')}.prof"
+        )
+        summary, total_time = await hass.async_add_executor_job(
+            write_profile, profile, path, call.data[ATTR_TOP]
+        )
+        persistent_notification.async_create(
+            hass,
+            f"Solmate used {total_time:.3f} s of event loop time in {duration:.0f} s"
+            f" ({100 * total_time / duration:.2f}%). Stats written to `{path}`.\n\n"
+            f"```\n{summary}\n```",
+            title="Solmate profile",
+            notification_id=f"{DOMAIN}_profile",
+        )
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, async_profile, schema=PROFILE_SCHEMA
+    )
@@ -2,30 +2,80 @@
 
 from __future__ import annotations
 
+from collections.abc import Callable, Mapping
+from datetime import timedelta
 import logging
+import math
+import time
+from typing import Any
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import ATTR_ENTITY_ID
-from homeassistant.core import Event, EventStateChangedData, HomeAssistant, callback
-from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.core import (
+    CALLBACK_TYPE,
+    Event,
+    EventStateChangedData,
+    HomeAssistant,
+    callback,
+)
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import dt as dt_util
 
+from .adaptive_timings import AdaptiveTimings
+from .charger_actuator import ChargerActuator
+from .coordinator import SolmatePollingCoordinator
+from .decision_exporter import EXPORT_DIRECTORY, DecisionExporter
+from .decision_history import DecisionHistory
+from .energy import EnergyAccounting
+from .fleet import async_get_fleet_dispatcher
+from .planner import ChargePlanner
+from .profiling import profiled
 from .solmate_state_machine import SolmateStateMachine
+from .telemetry import Telemetry
+from .tracing import TraceBuffer, Tracer
+from .warm_start import async_get_state_changes
 
 _LOGGER = logging.getLogger(__name__)
 
+AMPS_ROUNDING = {"floor": math.floor, "nearest": round}
+
+# Options besides the entity selections that can only change with a reload,
+# with their defaults.
+RELOAD_OPTIONS = {"export_format": "off"}
+
+
+def _planner_enabled(options: Mapping[str, Any]) -> bool:
+    """Return True if the options ask for a charge plan."""
+    return bool(options.get("pv_forecast_entity") and options.get("car_target_energy"))
+
 
 class SolmateController:
     """Solmate Controller."""
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        *,
+        actuator: ChargerActuator | None = None,
+        call_later: Callable[..., Callable[[], None]] = async_call_later,
+        clock: Callable[[], float] = time.time,
+        persist: bool = True,
+    ) -> None:
         """Initialize the sensor."""
         self._hass = hass
         self._entry = entry
+        self._clock = clock
+        self._options = dict(entry.options)
+        self._options_listeners: list[Callable[[], None]] = []
         self._state_change_callback_remover = None
         self._home_consumption_entity = entry.options["home_consumption_entity"]
         self._pv_production_entity = entry.options["pv_production_entity"]
         self._home_battery_soc_entity = entry.options["home_battery_soc_entity"]
         self._power_buffer = entry.options["power_buffer"]
+        self._home_battery_first = entry.options.get("charge_home_battery_first", False)
+        self._home_battery_threshold = entry.options["home_battery_threshold"]
+        self._amps_rounding = AMPS_ROUNDING[entry.options.get("amps_rounding", "floor")]
         self._charger_requested_charging_amps_entity = entry.options[
             "charger_requested_charging_amps_entity"
         ]
@@ -33,25 +83,74 @@ class SolmateController:
             "charger_current_charging_amps_entity"
         ]
         self._charger_switch_entity = entry.options["charger_switch_entity"]
+        self._poll_interval = entry.options.get("poll_interval", 0)
+        self._warm_start_minutes = entry.options.get("warm_start_minutes", 0)
+        self._coordinator = None
+        self._coordinator_listener_remover = None
 
-        self._sm = SolmateStateMachine(
+        self.trace_buffer = TraceBuffer()
+        self._tracer = Tracer(_LOGGER, self.trace_buffer)
+
+        self._actuator = actuator or ChargerActuator(
             hass,
-            self._charger_requested_charging_amps_entity,
             self._charger_switch_entity,
+            self._charger_requested_charging_amps_entity,
+            self.trace_buffer,
+            call_later=call_later,
+            clock=clock,
+        )
+        self.timings = AdaptiveTimings(entry.options)
+        self._sm = SolmateStateMachine(
+            hass, self._actuator, self.trace_buffer, self.timings, call_later
         )
-        self._sm.add_listener(LogListener())
-        self._sm.add_listener(EventProducingListener(hass, entry))
+        self._sm.add_listener(LogListener(self._tracer))
+        self._sm.add_listener(EventProducingListener(hass, entry, self._tracer))
+        self.history = DecisionHistory([state.id for state in self._sm.states])
+        self.telemetry = Telemetry()
+        self._sm.add_listener(self.telemetry)
+        self.energy = EnergyAccounting(hass, entry.entry_id, persist)
+        self._sm.add_listener(self.energy)
+
+        self.planner = None
+        if _planner_enabled(entry.options):
+            self.planner = ChargePlanner(
+                hass,
+                entry.entry_id,
+                entry.options["pv_forecast_entity"],
+                entry.options["car_target_energy"],
+                self._power_buffer,
+            )
+
+        self._exporter = None
+        export_format = entry.options.get("export_format", "off")
+        if export_format != "off":
+            self._exporter = DecisionExporter(
+                hass,
+                hass.config.path(EXPORT_DIRECTORY, entry.entry_id),
+                export_format,
+            )
+            self._sm.add_listener(self._exporter)
 
+    @profiled
     def _state_changed_listener(self, event: Event[EventStateChangedData]):
         """Handle state changes."""
         if event.data["entity_id"] == self._charger_current_charging_amps_entity:
-            self._sm.current_charging_amps = float(event.data["new_state"].state)
-            self._sm.send(
-                "current_charging_amps_changed",
-                current_charging_amps=self._sm.current_charging_amps,
-            )
+            try:
+                current_charging_amps = float(event.data["new_state"].state)
+            except (ValueError, AttributeError) as err:
+                self._tracer.warning(
+                    "Can't read the charger current: %s", err, rate_limited=True
+                )
+            else:
+                self._sm.current_charging_amps = current_charging_amps
+                self._actuator.current_amps_changed(current_charging_amps)
+                self._sm.send(
+                    "current_charging_amps_changed",
+                    current_charging_amps=current_charging_amps,
+                )
 
-        if event.data["entity_id"] in [
+        # In polling mode the coordinator evaluates once per poll cycle.
+        if self._coordinator is None and event.data["entity_id"] in [
             self._home_consumption_entity,
             self._pv_production_entity,
             self._home_battery_soc_entity,
@@ -59,6 +158,66 @@ class SolmateController:
         ]:
             self._update_should_charge_on_surplus()
 
+    @property
+    def state(self) -> str:
+        """Return the current state machine state."""
+        return self._sm.current_state.id
+
+    @property
+    def power_buffer(self) -> float:
+        """Return the power kept free of car charging, in watts."""
+        return self._power_buffer
+
+    @callback
+    def async_add_options_listener(self, listener: Callable[[], None]) -> CALLBACK_TYPE:
+        """Call listener whenever options are applied in place, return a remover."""
+        self._options_listeners.append(listener)
+
+        @callback
+        def remove() -> None:
+            self._options_listeners.remove(listener)
+
+        return remove
+
+    @callback
+    def async_update_options(self, options: Mapping[str, Any]) -> bool:
+        """Apply changed options without restarting the state machine.
+
+        Returns False, changing nothing, if the options change the entities or
+        components the entry is made of and the entry must be reloaded.
+        """
+        for key in set(options) | set(self._options):
+            if key.endswith("_entity") or key in RELOAD_OPTIONS:
+                default = RELOAD_OPTIONS.get(key)
+                if options.get(key, default) != self._options.get(key, default):
+                    return False
+        if _planner_enabled(options) != (self.planner is not None):
+            return False
+
+        previous_poll_interval = self._poll_interval
+        self._options = dict(options)
+        self._power_buffer = options["power_buffer"]
+        self._home_battery_first = options.get("charge_home_battery_first", False)
+        self._home_battery_threshold = options["home_battery_threshold"]
+        self._amps_rounding = AMPS_ROUNDING[options.get("amps_rounding", "floor")]
+        self._poll_interval = options.get("poll_interval", 0)
+        self.timings.update_bounds(options)
+        if self.planner:
+            self.planner.update_parameters(
+                options["car_target_energy"], self._power_buffer
+            )
+        self._tracer.info("Applied changed options")
+
+        running = self._state_change_callback_remover is not None
+        if running and self._poll_interval != previous_poll_interval:
+            self._stop_polling()
+            self._start_polling()
+        for listener in self._options_listeners:
+            listener()
+        if running:
+            self._update_should_charge_on_surplus()
+        return True
+
     def _update_should_charge_on_surplus(self):
         try:
             consumption = float(
@@ -66,33 +225,168 @@ class SolmateController:
             )
             production = float(self._hass.states.get(self._pv_production_entity).state)
             surplus = production - consumption - self._power_buffer
-            target_amps = int((surplus * 0.9) / 240)
-            if target_amps >= 5:
-                _LOGGER.info("Send start_charge_on_surplus %s", target_amps)
-                self._sm.send(
-                    "start_charge_on_surplus", surplus=surplus, target_amps=target_amps
-                )
+            target_amps = self._amps_rounding((surplus * 0.9) / 240)
+            if self.planner:
+                target_amps = self._apply_plan(target_amps, production, consumption)
+            home_battery_soc = self._home_battery_soc()
+            # If asked to, the home battery gets the surplus until it reaches
+            # the threshold.
+            if target_amps >= 5 and (
+                not self._home_battery_first
+                or home_battery_soc is None
+                or home_battery_soc >= self._home_battery_threshold
+            ):
+                command = "start_charge_on_surplus"
             else:
-                _LOGGER.info("Send stop_charge_on_surplus %s", target_amps)
-                self._sm.send(
-                    "stop_charge_on_surplus", surplus=surplus, target_amps=target_amps
+                command = "stop_charge_on_surplus"
+            self._tracer.debug("Send %s %s", command, target_amps, rate_limited=True)
+            self._sm.send(command, surplus=surplus, target_amps=target_amps)
+            now = self._clock()
+            self.timings.add_sample(now, surplus)
+            self.energy.add_sample(
+                now, self._sm.current_charging_amps, production, consumption
+            )
+            self.history.record(
+                now,
+                surplus,
+                target_amps,
+                self._sm.current_charging_amps,
+                self._sm.current_state.id,
+            )
+            self.telemetry.update(
+                surplus=round(surplus),
+                target_amps=target_amps,
+                actual_amps=self._sm.current_charging_amps,
+                state=self._sm.current_state.id,
+            )
+            if self._exporter:
+                self._exporter.record_decision(
+                    consumption=consumption,
+                    production=production,
+                    home_battery_soc=home_battery_soc,
+                    surplus=surplus,
+                    target_amps=target_amps,
+                    actual_amps=self._sm.current_charging_amps,
+                    state=self._sm.current_state.id,
+                    command=command,
                 )
 
         except (ValueError, AttributeError) as err:
-            _LOGGER.error("Can't convert entity state to float: %s", err)
+            self._tracer.error(
+                "Can't convert entity state to float: %s", err, rate_limited=True
+            )
+
+    def _apply_plan(self, target_amps: int, production: float, consumption: float):
+        """Raise the target amps to the floor of the charge plan."""
+        now = dt_util.utcnow()
+        self.planner.add_sample(
+            now,
+            production,
+            consumption,
+            self.energy.totals["lifetime_solar"] + self.energy.totals["lifetime_grid"],
+        )
+        return max(target_amps, self.planner.floor_amps(now))
+
+    async def async_load(self) -> None:
+        """Load the persisted energy totals and charge plan profile."""
+        await self.energy.async_load()
+        if self.planner:
+            await self.planner.async_load()
+
+    async def async_save(self) -> None:
+        """Persist the energy totals and charge plan profile."""
+        await self.energy.async_save()
+        if self.planner:
+            await self.planner.async_save()
+
+    def _home_battery_soc(self) -> float | None:
+        """Return the home battery state of charge, if known."""
+        try:
+            return float(self._hass.states.get(self._home_battery_soc_entity).state)
+        except (ValueError, AttributeError):
+            return None
+
+    async def async_start(self) -> None:
+        """Seed the inputs from the recorder if configured, then start."""
+        if self._warm_start_minutes:
+            try:
+                await self._async_warm_start()
+            except Exception:
+                # A cold start beats not starting at all.
+                _LOGGER.exception("Error warm starting, starting without history")
+        self.start()
+
+    async def _async_warm_start(self) -> None:
+        """Replay the recent input changes into the controller statistics."""
+        changes = await async_get_state_changes(
+            self._hass,
+            [
+                self._home_consumption_entity,
+                self._pv_production_entity,
+            ],
+            timedelta(minutes=self._warm_start_minutes),
+        )
+        # Samples of earlier slots were already learned by the planner before
+        # the restart.
+        planner_since = (
+            ChargePlanner.slot_start(dt_util.utcnow()).timestamp()
+            if self.planner
+            else math.inf
+        )
+        delivered_energy = (
+            self.energy.totals["lifetime_solar"] + self.energy.totals["lifetime_grid"]
+        )
+        values: dict[str, float] = {}
+        samples = 0
+        for timestamp, entity_id, state in changes:
+            try:
+                values[entity_id] = float(state)
+            except ValueError:
+                values.pop(entity_id, None)
+                continue
+            try:
+                consumption = values[self._home_consumption_entity]
+                production = values[self._pv_production_entity]
+            except KeyError:
+                continue
+            samples += 1
+            self.timings.add_sample(
+                timestamp, production - consumption - self._power_buffer
+            )
+            if timestamp >= planner_since:
+                self.planner.add_sample(
+                    dt_util.utc_from_timestamp(timestamp),
+                    production,
+                    consumption,
+                    delivered_energy,
+                )
+        self._tracer.info(
+            "Warm started from %s samples over %s minutes",
+            samples,
+            self._warm_start_minutes,
+        )
 
     def start(self) -> None:
         """Start the state machine."""
 
-        _LOGGER.info("Starting solmate controller")
+        self._tracer.info("Starting solmate controller")
+
+        try:
+            self._sm.current_charging_amps = float(
+                self._hass.states.get(self._charger_current_charging_amps_entity).state
+            )
+        except (ValueError, AttributeError):
+            self._sm.current_charging_amps = 0
+        self._actuator.current_amps_changed(self._sm.current_charging_amps)
 
         @callback
         def async_state_changed_listener(event: Event[EventStateChangedData]):
             """Handle state changes."""
             self._state_changed_listener(event)
 
-        self._state_change_callback_remover = async_track_state_change_event(
-            self._hass,
+        self._state_change_callback_remover = async_get_fleet_dispatcher(
+            self._hass
+        ).async_track(
             [
                 self._home_consumption_entity,
                 self._pv_production_entity,
@@ -102,29 +396,84 @@ class SolmateController:
             async_state_changed_listener,
         )
 
+        if self._exporter:
+            self._exporter.start()
+
+        self._start_polling()
+
         self._sm.send("ha_startup")
+        # Decide from the current states right away instead of waiting for
+        # the next input change.
+        self._update_should_charge_on_surplus()
+
+    def _start_polling(self) -> None:
+        """Poll the inputs instead of reacting to them, if configured."""
+        if self._poll_interval:
+            self._coordinator = SolmatePollingCoordinator(
+                self._hass,
+                self._entry,
+                [
+                    self._home_consumption_entity,
+                    self._pv_production_entity,
+                    self._home_battery_soc_entity,
+                    self._charger_current_charging_amps_entity,
+                ],
+                self._pv_production_entity,
+                timedelta(seconds=self._poll_interval),
+                lambda: self.state,
+            )
+            self._coordinator_listener_remover = self._coordinator.async_add_listener(
+                self._async_inputs_polled
+            )
+
+    @callback
+    def _async_inputs_polled(self) -> None:
+        """Evaluate the polled inputs, then adapt the poll rate to the result."""
+        self._update_should_charge_on_surplus()
+        if self._coordinator is not None:
+            self._coordinator.async_update_interval()
+
+    def _stop_polling(self) -> None:
+        if self._coordinator_listener_remover:
+            self._coordinator_listener_remover()
+            self._coordinator_listener_remover = None
+            self._coordinator = None
 
     def stop(self) -> None:
         """Stop the state machine."""
         if self._state_change_callback_remover:
             self._state_change_callback_remover()
+            self._state_change_callback_remover = None
+        self._stop_polling()
+        self._sm.stop_timers()
+        self._actuator.stop()
+        self.telemetry.close()
+        if self._exporter:
+            self._exporter.stop()
 
 
 class LogListener:
     """Log listener."""
 
+    def __init__(self, tracer: Tracer) -> None:
+        """Initialize the listener."""
+        self._tracer = tracer
+
     def after_transition(self, event, source, target):
         """Log after transition."""
-        _LOGGER.info(
+        self._tracer.debug(
             "STATE MACHINE: after transition %s --%s--> %s",
             source.id,
             event,
             target.id,
+            rate_limited=source == target,
         )
 
-    def on_enter_state(self, target, event):
+    def on_enter_state(self, source, target, event):
         """Log enter state."""
-        _LOGGER.info(
+        if source == target:
+            return
+        self._tracer.info(
             "STATE MACHINE: Entering %s from event %s",
             target.id,
             event,
@@ -134,18 +483,20 @@ class LogListener:
 class EventProducingListener:
     """Log listener."""
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, tracer: Tracer) -> None:
         """Initialize the listener."""
         self._hass = hass
         self._entry = entry
+        self._tracer = tracer
 
     def on_enter_state(self, target, event):
         """Log enter state."""
-        _LOGGER.info(
-            "STATE MACHINE !!!!: Entering %s from event %s: %s",
+        self._tracer.debug(
+            "Firing solmate_state_changed_event for %s from event %s: %s",
             target.id,
             event,
             self._entry.entry_id,
+            rate_limited=True,
         )
         self._hass.bus.async_fire(
             "solmate_state_changed_event",
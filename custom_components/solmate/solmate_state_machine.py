@@ -1,5 +1,6 @@
 """Solmate State Machine."""
 
+from collections.abc import Callable
 from datetime import datetime, timedelta
 import logging
 
@@ -10,11 +11,12 @@ from homeassistant.core import Event, EventStateChangedData, HomeAssistant, call
 from homeassistant.helpers.event import async_call_later
 from homeassistant.util import dt as dt_util
 
-_LOGGER = logging.getLogger(__name__)
+from .adaptive_timings import AdaptiveTimings
+from .charger_actuator import ChargerActuator
+from .profiling import profiled
+from .tracing import TraceBuffer, Tracer
 
-CHARGE_START_DEBOUNCE = timedelta(seconds=3)
-CHARGE_STOP_DEBOUNCE = timedelta(seconds=3)
-CHARGE_SESSION_PAUSE = timedelta(seconds=10)
+_LOGGER = logging.getLogger(__name__)
 
 
 class SolmateStateMachine(sm.StateMachine):
@@ -74,30 +76,54 @@ class SolmateStateMachine(sm.StateMachine):
     def __init__(
         self,
         hass: HomeAssistant,
-        charger_requested_charging_amps_entity: str,
-        charger_switch_entity: str,
+        actuator: ChargerActuator,
+        trace_buffer: TraceBuffer | None = None,
+        timings: AdaptiveTimings | None = None,
+        call_later: Callable[..., Callable[[], None]] = async_call_later,
     ) -> None:
         """Initialize the state machine."""
+        self._tracer = Tracer(_LOGGER, trace_buffer or TraceBuffer())
         super().__init__(allow_event_without_transition=True)
         self._hass = hass
-        self._charger_requested_charging_amps_entity = (
-            charger_requested_charging_amps_entity
-        )
-        self._charger_switch_entity = charger_switch_entity
+        self._actuator = actuator
 
         self._car_present = False
         self._last_target_amps = 0
 
+        self._timings = timings or AdaptiveTimings({})
         self._charge_start_pending_timer = Timer(
-            hass, self, "charge_start_timer_fired", CHARGE_START_DEBOUNCE
+            hass,
+            self,
+            "charge_start_timer_fired",
+            lambda: self._timings.start_debounce,
+            call_later,
         )
         self._charge_stop_pending_timer = Timer(
-            hass, self, "charge_stop_timer_fired", CHARGE_STOP_DEBOUNCE
+            hass,
+            self,
+            "charge_stop_timer_fired",
+            lambda: self._timings.stop_debounce,
+            call_later,
         )
         self._charge_session_pause_timer = Timer(
-            hass, self, "charge_session_pause_timer_fired", CHARGE_SESSION_PAUSE
+            hass,
+            self,
+            "charge_session_pause_timer_fired",
+            lambda: self._timings.session_pause,
+            call_later,
         )
 
+    @profiled
+    def send(self, event: str, *args, **kwargs):
+        """Send an event to the state machine."""
+        return super().send(event, *args, **kwargs)
+
+    def stop_timers(self):
+        """Stop all pending timers."""
+        self._charge_start_pending_timer.stop()
+        self._charge_stop_pending_timer.stop()
+        self._charge_session_pause_timer.stop()
+
     def is_car_present(self, state):
         """Check if car is present."""
         return True
@@ -105,8 +131,8 @@ class SolmateStateMachine(sm.StateMachine):
     @reset.enter
     def do_reset(self, state):
         """Handle reset state entry."""
-        _LOGGER.info("Entering reset state")
-        self._hass.states.async_set(self._charger_switch_entity, "off")
+        self._tracer.info("Entering reset state")
+        self._actuator.turn_off()
         self.send("reset_complete")
 
     @charge_start_pending.enter
@@ -122,17 +148,17 @@ class SolmateStateMachine(sm.StateMachine):
     @charging_warmup.enter
     def start_charging_warmup(self, state):
         """Set the requested charging amps."""
-        self._hass.states.async_set(self._charger_requested_charging_amps_entity, 5.0)
-        self._hass.states.async_set(self._charger_switch_entity, "on")
+        self._actuator.set_amps(5.0)
+        self._last_target_amps = 5
+        self._actuator.turn_on()
 
     @charging.enter
     def charge_at_target_amps(self, state, target_amps=None):
         """Start charging."""
-        _LOGGER.info("Starting charging")
-        if target_amps != self._last_target_amps:
-            self._hass.states.async_set(
-                self._charger_requested_charging_amps_entity, target_amps
-            )
+        # Entering from charging_warmup carries no target; keep the warmup amps.
+        if target_amps is not None and target_amps != self._last_target_amps:
+            self._tracer.info("Charging at %s amps", target_amps, rate_limited=True)
+            self._actuator.set_amps(target_amps)
             self._last_target_amps = target_amps
 
     @stop_charge_pending.enter
@@ -148,8 +174,8 @@ class SolmateStateMachine(sm.StateMachine):
     @charging_cooldown.enter
     def stop_charging(self, state):
         """Stop charging."""
-        _LOGGER.info("Stopping charging")
-        self._hass.states.async_set(self._charger_switch_entity, "off")
+        self._tracer.info("Stopping charging")
+        self._actuator.turn_off()
         if self.current_charging_amps == 0:
             self.send("already_stopped")
 
@@ -172,13 +198,15 @@ class Timer:
         hass: HomeAssistant,
         state_machine: sm.StateMachine,
         event_name: str,
-        delay: timedelta,
+        delay: Callable[[], timedelta],
+        call_later: Callable[..., Callable[[], None]] = async_call_later,
     ) -> None:
         """Initialize the timer."""
         self._hass = hass
         self._state_machine = state_machine
         self._event_name = event_name
         self._delay = delay
+        self._call_later = call_later
         self._unsub_timer = None
 
     def start(self):
@@ -190,7 +218,7 @@ class Timer:
             self._state_machine.send(self._event_name)
             self._unsub_timer = None
 
-        self._unsub_timer = async_call_later(self._hass, self._delay, _timer_callback)
+        self._unsub_timer = self._call_later(self._hass, self._delay(), _timer_callback)
 
     def cancel(self):
         """Cancel the timer."""
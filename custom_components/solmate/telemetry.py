@@ -0,0 +1,68 @@
+"""Live controller telemetry."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, callback
+
+
+class Telemetry:
+    """Latest controller telemetry, pushing changed values to listeners."""
+
+    def __init__(self) -> None:
+        """Initialize the telemetry."""
+        self.payload: dict[str, Any] = {}
+        self._listeners: list[Callable[[dict[str, Any]], None]] = []
+        self._close_listeners: list[Callable[[], None]] = []
+
+    @callback
+    def async_add_listener(
+        self,
+        listener: Callable[[dict[str, Any]], None],
+        on_close: Callable[[], None] | None = None,
+    ) -> CALLBACK_TYPE:
+        """Call listener with the changed values, return a remover.
+
+        on_close is called when the controller stops and no more updates will
+        come.
+        """
+        self._listeners.append(listener)
+        if on_close:
+            self._close_listeners.append(on_close)
+
+        @callback
+        def remove() -> None:
+            self._listeners.remove(listener)
+            if on_close:
+                self._close_listeners.remove(on_close)
+
+        return remove
+
+    @callback
+    def close(self) -> None:
+        """Drop every listener, telling them that updates have ended."""
+        close_listeners = self._close_listeners
+        self._listeners = []
+        self._close_listeners = []
+        for on_close in close_listeners:
+            on_close()
+
+    @callback
+    def update(self, **values: Any) -> None:
+        """Update the payload and notify listeners of the changed values."""
+        changed = {
+            key: value
+            for key, value in values.items()
+            if self.payload.get(key) != value
+        }
+        if not changed:
+            return
+        self.payload.update(changed)
+        for listener in list(self._listeners):
+            listener(changed)
+
+    def after_transition(self, target):
+        """Publish state changes, including ones triggered by timers."""
+        self.update(state=target.id)
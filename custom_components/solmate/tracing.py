@@ -0,0 +1,100 @@
+"""Cheap, rate limited logging for the controller hot path."""
+
+from __future__ import annotations
+
+from collections import deque
+from datetime import datetime
+import logging
+import time
+from typing import Any
+
+DEFAULT_TRACE_CAPACITY = 500
+DEFAULT_RATE_LIMIT = 60.0
+
+
+class TraceBuffer:
+    """Ring buffer of recent, unformatted trace records."""
+
+    def __init__(self, capacity: int = DEFAULT_TRACE_CAPACITY) -> None:
+        """Initialize the buffer."""
+        self._records: deque[tuple[float, str, int, str, tuple]] = deque(
+            maxlen=capacity
+        )
+
+    def append(self, name: str, level: int, msg: str, args: tuple) -> None:
+        """Store a record without formatting it."""
+        self._records.append((time.time(), name, level, msg, args))
+
+    def dump(self) -> list[dict[str, Any]]:
+        """Return the stored records, formatted, oldest first."""
+        dumped = []
+        for timestamp, name, level, msg, args in self._records:
+            try:
+                message = msg % args if args else msg
+            except (TypeError, ValueError):
+                message = f"{msg} {args!r}"
+            dumped.append(
+                {
+                    "time": datetime.fromtimestamp(timestamp).isoformat(),
+                    "logger": name,
+                    "level": logging.getLevelName(level),
+                    "message": message,
+                }
+            )
+        return dumped
+
+
+class Tracer:
+    """Logger front end that records into a TraceBuffer.
+
+    Formatting only happens when the logger is enabled for the level.
+    Messages logged with ``rate_limited=True`` are emitted at most once per
+    ``rate_limit`` seconds per message template; the number of suppressed
+    records is reported with the next emitted one.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        buffer: TraceBuffer,
+        rate_limit: float = DEFAULT_RATE_LIMIT,
+    ) -> None:
+        """Initialize the tracer."""
+        self._logger = logger
+        self._buffer = buffer
+        self._rate_limit = rate_limit
+        self._last_emitted: dict[str, float] = {}
+        self._suppressed: dict[str, int] = {}
+
+    def debug(self, msg: str, *args: Any, rate_limited: bool = False) -> None:
+        """Trace a debug record."""
+        self._log(logging.DEBUG, msg, args, rate_limited)
+
+    def info(self, msg: str, *args: Any, rate_limited: bool = False) -> None:
+        """Trace an info record."""
+        self._log(logging.INFO, msg, args, rate_limited)
+
+    def warning(self, msg: str, *args: Any, rate_limited: bool = False) -> None:
+        """Trace a warning record."""
+        self._log(logging.WARNING, msg, args, rate_limited)
+
+    def error(self, msg: str, *args: Any, rate_limited: bool = False) -> None:
+        """Trace an error record."""
+        self._log(logging.ERROR, msg, args, rate_limited)
+
+    def _log(self, level: int, msg: str, args: tuple, rate_limited: bool) -> None:
+        self._buffer.append(self._logger.name, level, msg, args)
+        if not self._logger.isEnabledFor(level):
+            return
+
+        if rate_limited:
+            now = time.monotonic()
+            if now - self._last_emitted.get(msg, -self._rate_limit) < self._rate_limit:
+                self._suppressed[msg] = self._suppressed.get(msg, 0) + 1
+                return
+            self._last_emitted[msg] = now
+            if suppressed := self._suppressed.pop(msg, 0):
+                msg = f"{msg} (%d similar messages suppressed)"
+                args = (*args, suppressed)
+
+        self._logger.log(level, msg, *args)
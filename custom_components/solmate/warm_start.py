@@ -0,0 +1,52 @@
+"""Recent input history from the recorder, to warm start the controller."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from functools import partial
+import heapq
+import logging
+
+from homeassistant.components.recorder import get_instance, history
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_get_state_changes(
+    hass: HomeAssistant, entity_ids: list[str], duration: timedelta
+) -> list[tuple[float, str, str]]:
+    """Return (timestamp, entity id, state) changes over the last duration.
+
+    All entities are fetched in one recorder query, run in the recorder
+    executor. The changes are returned oldest first, starting with the state
+    each entity had at the start of the period.
+    """
+    if "recorder" not in hass.config.components:
+        _LOGGER.warning("Can't warm start without the recorder")
+        return []
+    end_time = dt_util.utcnow()
+    states = await get_instance(hass).async_add_executor_job(
+        partial(
+            history.get_significant_states,
+            hass,
+            end_time - duration,
+            end_time,
+            entity_ids,
+            include_start_time_state=True,
+            significant_changes_only=False,
+            no_attributes=True,
+        )
+    )
+    return list(
+        heapq.merge(
+            *(
+                [
+                    (state.last_updated.timestamp(), entity_id, state.state)
+                    for state in entity_states
+                ]
+                for entity_id, entity_states in states.items()
+            )
+        )
+    )
@@ -0,0 +1,128 @@
+"""WebSocket API for live solmate telemetry."""
+
+from __future__ import annotations
+
+import time
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import DOMAIN
+
+DEFAULT_MIN_INTERVAL = 1.0
+
+
+@callback
+def async_setup_websocket_api(hass: HomeAssistant) -> None:
+    """Register the solmate WebSocket commands."""
+    websocket_api.async_register_command(hass, websocket_subscribe_telemetry)
+
+
+class _ThrottledSubscriber:
+    """Sends telemetry deltas to one subscriber at most every min_interval."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        connection: websocket_api.ActiveConnection,
+        msg_id: int,
+        min_interval: float,
+    ) -> None:
+        self._hass = hass
+        self._connection = connection
+        self._msg_id = msg_id
+        self._min_interval = min_interval
+        self._sent: dict[str, Any] = {}
+        self._pending: dict[str, Any] = {}
+        self._last_send = 0.0
+        self._unsub_timer = None
+
+    @callback
+    def update(self, changed: dict[str, Any]) -> None:
+        """Queue changed values and send them when the rate allows."""
+        self._pending.update(changed)
+        if self._unsub_timer:
+            return
+        wait = self._last_send + self._min_interval - time.monotonic()
+        if wait <= 0:
+            self._flush()
+        else:
+            self._unsub_timer = async_call_later(self._hass, wait, self._flush)
+
+    @callback
+    def _flush(self, *_: Any) -> None:
+        self._unsub_timer = None
+        delta = {
+            key: value
+            for key, value in self._pending.items()
+            if key not in self._sent or self._sent[key] != value
+        }
+        self._pending.clear()
+        if not delta:
+            return
+        self._sent.update(delta)
+        self._last_send = time.monotonic()
+        self._connection.send_message(websocket_api.event_message(self._msg_id, delta))
+
+    @callback
+    def cancel(self) -> None:
+        """Cancel a pending send."""
+        if self._unsub_timer:
+            self._unsub_timer()
+            self._unsub_timer = None
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "solmate/subscribe_telemetry",
+        vol.Required("entry_id"): str,
+        vol.Optional("min_interval", default=DEFAULT_MIN_INTERVAL): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=3600)
+        ),
+    }
+)
+@callback
+def websocket_subscribe_telemetry(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Stream controller telemetry deltas, starting with the full payload."""
+    entry = hass.config_entries.async_get_entry(msg["entry_id"])
+    if (
+        entry is None
+        or entry.domain != DOMAIN
+        or entry.state is not ConfigEntryState.LOADED
+    ):
+        connection.send_error(
+            msg["id"], websocket_api.ERR_NOT_FOUND, "Solmate entry not found"
+        )
+        return
+
+    telemetry = entry.runtime_data.telemetry
+    subscriber = _ThrottledSubscriber(hass, connection, msg["id"], msg["min_interval"])
+
+    @callback
+    def closed() -> None:
+        """End the subscription when the entry is unloaded or reloaded."""
+        subscriber.cancel()
+        if connection.subscriptions.pop(msg["id"], None) is not None:
+            connection.send_error(
+                msg["id"], websocket_api.ERR_NOT_FOUND, "Solmate entry unloaded"
+            )
+
+    remove_listener = telemetry.async_add_listener(subscriber.update, closed)
+
+    @callback
+    def unsubscribe() -> None:
+        remove_listener()
+        subscriber.cancel()
+
+    connection.subscriptions[msg["id"]] = unsubscribe
+    connection.send_result(msg["id"])
+    subscriber.update(dict(telemetry.payload))
@@ -1,6 +1,7 @@
 """Switch platform for solmate_mocks integration."""
 
 import logging
+from typing import Any
 
 from homeassistant.components.switch import SwitchDeviceClass, SwitchEntity
 from homeassistant.config_entries import ConfigEntry
@@ -36,6 +37,14 @@ class MockChargerSwitch(SwitchEntity):
             entry_type=DeviceEntryType.SERVICE,
         )
 
+    async def async_turn_on(self, **kwargs: Any) -> None:
+        """Turn the switch on."""
+        await self.async_set_native_value(True)
+
+    async def async_turn_off(self, **kwargs: Any) -> None:
+        """Turn the switch off."""
+        await self.async_set_native_value(False)
+
     async def async_set_native_value(self, value: bool) -> None:
         """Update the current value."""
         self._attr_is_on = bool(value)
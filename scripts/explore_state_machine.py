@@ -0,0 +1,253 @@
+"""Exhaustively explore the configurations of SolmateStateMachine.
+
+Every reachable (state, pending timers, charging amps bucket) configuration is
+enumerated by trying every input event and every pending timer in every
+order, against a virtual clock. Configurations are memoized, so the search
+finishes in well under a second.
+
+Reports:
+  * states that can never be entered,
+  * deadlocks: configurations from which not_charging can't be reached at
+    all, and configurations that only the charger reporting different amps
+    can leave, with no timer pending to time out (e.g. stuck in
+    charging_warmup or charging_cooldown),
+  * timer leaks: a Timer started twice ("Timer already started") or left
+    pending after its state was exited.
+
+Run from the repository root:
+
+    python scripts/explore_state_machine.py
+
+Exits with status 1 when any problem is found.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custom_components.solmate.solmate_state_machine import (
+    SolmateStateMachine,
+)
+from scripts.simulation import RecordingActuator, VirtualClock
+
+IDLE_STATE = "not_charging"
+
+# Representative charging amps for each bucket the transition guards tell apart.
+AMPS_BUCKETS = {"0A": 0.0, "1-4A": 3.0, ">=5A": 10.0}
+
+# Events driven by the controller or the user, independent of the charger.
+CONTROL_EVENTS = [
+    ("ha_startup", {}),
+    ("start_charge_on_surplus", {"surplus": 2000.0, "target_amps": 6}),
+    ("start_charge_on_surplus", {"surplus": 3000.0, "target_amps": 10}),
+    ("stop_charge_on_surplus", {"surplus": 0.0, "target_amps": 0}),
+    ("manual_stop", {}),
+    ("shutdown_triggered", {}),
+]
+
+# Which state owns each timer; a timer pending outside its state has leaked.
+TIMER_OWNERS = {
+    "charge_start_timer_fired": "charge_start_pending",
+    "charge_stop_timer_fired": "stop_charge_pending",
+    "charge_session_pause_timer_fired": "paused",
+}
+
+
+@dataclass(frozen=True)
+class Step:
+    """One input to the state machine."""
+
+    kind: str  # "event", "amps" or "timer"
+    name: str
+    kwargs: tuple = ()
+
+    def __str__(self) -> str:
+        """Return a readable description."""
+        if self.kind == "amps":
+            return f"charger reports {self.name}"
+        if self.kind == "timer":
+            return f"{self.name} (timer)"
+        return self.name
+
+    @property
+    def needs_charger(self) -> bool:
+        """Return True if the step depends on the charger changing its amps."""
+        return self.kind == "amps"
+
+
+def amps_bucket(amps: float) -> str:
+    """Return the bucket amps falls into."""
+    if amps >= 5:
+        return ">=5A"
+    if amps > 0:
+        return "1-4A"
+    return "0A"
+
+
+class Simulation:
+    """A state machine instance replayed from a list of steps."""
+
+    def __init__(self, path: tuple[Step, ...]) -> None:
+        """Replay path on a fresh state machine."""
+        self.clock = VirtualClock()
+        self.actuator = RecordingActuator()
+        self.sm = SolmateStateMachine(
+            None, self.actuator, call_later=self.clock.call_later
+        )
+        self.entered: set[str] = {self.sm.current_state.id}
+        self.sm.add_listener(self)
+        for step in path:
+            self.apply(step)
+
+    def apply(self, step: Step) -> None:
+        """Apply one step."""
+        if step.kind == "timer":
+            self.clock.fire(step.name)
+        elif step.kind == "amps":
+            self.sm.current_charging_amps = AMPS_BUCKETS[step.name]
+            self.sm.send(
+                "current_charging_amps_changed",
+                current_charging_amps=self.sm.current_charging_amps,
+            )
+        else:
+            self.sm.send(step.name, **dict(step.kwargs))
+
+    def on_enter_state(self, target) -> None:
+        """Remember states entered, including ones left immediately."""
+        self.entered.add(target.id)
+
+    def key(self) -> tuple[str, frozenset[str], str]:
+        """Return the configuration the machine is in."""
+        return (
+            self.sm.current_state.id,
+            frozenset(self.clock.pending()),
+            amps_bucket(self.sm.current_charging_amps),
+        )
+
+    def steps(self) -> list[Step]:
+        """Return every step that can be applied next."""
+        steps = [
+            Step("event", name, tuple(sorted(kwargs.items())))
+            for name, kwargs in CONTROL_EVENTS
+        ]
+        steps += [
+            Step("amps", bucket)
+            for bucket in AMPS_BUCKETS
+            if bucket != amps_bucket(self.sm.current_charging_amps)
+        ]
+        steps += [Step("timer", name) for name in sorted(set(self.clock.pending()))]
+        return steps
+
+
+def explore():
+    """Breadth-first search over all reachable configurations."""
+    start = Simulation(())
+    paths = {start.key(): ()}
+    edges: dict[tuple, list[tuple[Step, tuple]]] = {}
+    leaks: list[tuple[tuple[Step, ...], str]] = []
+    entered = set(start.entered)
+    queue = deque([start.key()])
+
+    while queue:
+        key = queue.popleft()
+        path = paths[key]
+        edges[key] = []
+        for step in Simulation(path).steps():
+            simulation = Simulation(path)
+            try:
+                simulation.apply(step)
+            except ValueError as err:
+                leaks.append(((*path, step), str(err)))
+                continue
+            entered |= simulation.entered
+            next_key = simulation.key()
+            for timer in next_key[1]:
+                if TIMER_OWNERS.get(timer) != next_key[0]:
+                    leaks.append(((*path, step), f"{timer} pending in {next_key[0]}"))
+            edges[key].append((step, next_key))
+            if next_key not in paths:
+                paths[next_key] = (*path, step)
+                queue.append(next_key)
+
+    return paths, edges, leaks, entered
+
+
+def can_reach_idle(edges) -> set[tuple]:
+    """Return the configurations from which the idle state is reachable."""
+    reverse: dict[tuple, list[tuple]] = {}
+    for key, outgoing in edges.items():
+        for _, next_key in outgoing:
+            reverse.setdefault(next_key, []).append(key)
+
+    reached = {key for key in edges if key[0] == IDLE_STATE}
+    queue = deque(reached)
+    while queue:
+        for previous in reverse.get(queue.popleft(), ()):
+            if previous not in reached:
+                reached.add(previous)
+                queue.append(previous)
+    return reached
+
+
+def waits_on_charger(key, outgoing) -> bool:
+    """Return True if only a charger amps change can leave the configuration."""
+    return not any(
+        next_key != key for step, next_key in outgoing if not step.needs_charger
+    )
+
+
+def describe(key) -> str:
+    """Return a readable configuration."""
+    state, timers, bucket = key
+    pending = ", ".join(sorted(timers)) or "no timers"
+    return f"{state} [{pending}] charger at {bucket}"
+
+
+def main() -> int:
+    """Explore the state machine and print a report."""
+    paths, edges, leaks, entered = explore()
+    final_states = {state.id for state in SolmateStateMachine.states if state.final}
+    unreachable = [
+        state.id for state in SolmateStateMachine.states if state.id not in entered
+    ]
+
+    live = can_reach_idle(edges)
+    stuck = sorted(
+        key for key in edges if key not in live and key[0] not in final_states
+    )
+    waiting = sorted(
+        key
+        for key, outgoing in edges.items()
+        if key in live
+        and key[0] not in final_states
+        and waits_on_charger(key, outgoing)
+    )
+
+    print(f"Explored {len(paths)} configurations.")
+    print(f"Unreachable states: {', '.join(unreachable) or 'none'}")
+
+    print(f"Deadlocks (can never return to {IDLE_STATE}): {len(stuck)}")
+    for key in stuck:
+        print(f"  {describe(key)}")
+        print(f"    via: {' -> '.join(map(str, paths[key])) or '(start)'}")
+
+    print(f"Waiting on the charger with no timeout: {len(waiting)}")
+    for key in waiting:
+        print(f"  {describe(key)}")
+        print(f"    via: {' -> '.join(map(str, paths[key]))}")
+
+    print(f"Timer leaks: {len(leaks)}")
+    for path, error in leaks:
+        print(f"  {error}")
+        print(f"    via: {' -> '.join(map(str, path))}")
+
+    return 1 if unreachable or stuck or waiting or leaks else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""Helpers to drive the solmate controller without a running event loop."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Coroutine
+from datetime import UTC, datetime, timedelta
+import heapq
+from itertools import count
+from typing import Any
+
+
+class VirtualClock:
+    """Deterministic replacement for async_call_later.
+
+    Scheduled callbacks only run when the clock is advanced or when a pending
+    callback is fired explicitly, so every ordering of timers can be tried.
+    """
+
+    def __init__(self, start: float = 0.0) -> None:
+        """Initialize the clock."""
+        self.now = start
+        self._queue: list[tuple[float, int, str]] = []
+        self._callbacks: dict[int, tuple[str, Callable[[datetime], Any]]] = {}
+        self._seq = count()
+
+    def call_later(
+        self, hass: Any, delay: timedelta | float, action: Callable[[datetime], Any]
+    ) -> Callable[[], None]:
+        """Schedule action after delay, return a cancel callback."""
+        if isinstance(delay, timedelta):
+            delay = delay.total_seconds()
+        seq = next(self._seq)
+        name = _callback_name(action)
+        self._callbacks[seq] = (name, action)
+        heapq.heappush(self._queue, (self.now + delay, seq, name))
+
+        def cancel() -> None:
+            self._callbacks.pop(seq, None)
+
+        return cancel
+
+    def pending(self) -> list[str]:
+        """Return the names of the pending callbacks, earliest first."""
+        return [name for _, seq, name in sorted(self._queue) if seq in self._callbacks]
+
+    def fire(self, name: str) -> bool:
+        """Run the earliest pending callback called name, ignoring its due time."""
+        for due, seq, pending_name in sorted(self._queue):
+            if pending_name == name and seq in self._callbacks:
+                self.now = max(self.now, due)
+                self._run(seq)
+                return True
+        return False
+
+    def advance_to(self, timestamp: float) -> None:
+        """Run every callback due up to timestamp, in order."""
+        while self._queue and self._queue[0][0] <= timestamp:
+            due, seq, _ = heapq.heappop(self._queue)
+            if seq in self._callbacks:
+                self.now = max(self.now, due)
+                self._run(seq)
+        self.now = max(self.now, timestamp)
+
+    def _run(self, seq: int) -> None:
+        _, action = self._callbacks.pop(seq)
+        self._queue = [entry for entry in self._queue if entry[1] != seq]
+        heapq.heapify(self._queue)
+        result = action(datetime.fromtimestamp(self.now, UTC))
+        if isinstance(result, Coroutine):
+            _run_coroutine(result)
+
+
+def _callback_name(action: Callable[..., Any]) -> str:
+    """Name a callback after the event of the Timer that scheduled it."""
+    # Timer callbacks are closures over the Timer instance.
+    for cell in getattr(action, "__closure__", None) or ():
+        if name := getattr(cell.cell_contents, "_event_name", None):
+            return name
+    return getattr(action, "__name__", "callback")
+
+
+def _run_coroutine(coro: Coroutine) -> None:
+    """Run a coroutine that never actually suspends."""
+    try:
+        coro.send(None)
+    except StopIteration:
+        return
+    coro.close()
+    raise RuntimeError("Simulated callbacks must not await")
+
+
+class RecordingActuator:
+    """Charger actuator that records commands instead of sending them."""
+
+    def __init__(self) -> None:
+        """Initialize the actuator."""
+        self.commands: list[tuple[str, float | None]] = []
+        self.switch_on = False
+        self.requested_amps = 0.0
+
+    def turn_on(self) -> None:
+        """Record a turn on command."""
+        self.commands.append(("turn_on", None))
+        self.switch_on = True
+
+    def turn_off(self) -> None:
+        """Record a turn off command."""
+        self.commands.append(("turn_off", None))
+        self.switch_on = False
+
+    def set_amps(self, amps: float) -> None:
+        """Record a set amps command."""
+        if amps is None:
+            raise ValueError("Requested charging amps must be a number")
+        self.commands.append(("set_amps", amps))
+        self.requested_amps = amps
+
+    def current_amps_changed(self, amps: float) -> None:
+        """Ignore confirmations."""
+
+    def stop(self) -> None:
+        """Nothing in flight to cancel."""
+
+
+class SimulatedState:
+    """Entity state as seen by the controller."""
+
+    def __init__(self, entity_id: str, state: str) -> None:
+        """Initialize the state."""
+        self.entity_id = entity_id
+        self.state = state
+
+
+class SimulatedEvent:
+    """Event delivered to bus listeners."""
+
+    def __init__(self, event_type: str, data: dict[str, Any]) -> None:
+        """Initialize the event."""
+        self.event_type = event_type
+        self.data = data
+
+
+class SimulatedBus:
+    """Synchronous event bus."""
+
+    def __init__(self) -> None:
+        """Initialize the bus."""
+        self._listeners: list[tuple[str, Callable, Callable | None]] = []
+
+    def async_listen(
+        self,
+        event_type: str,
+        listener: Callable[[SimulatedEvent], Any],
+        event_filter: Callable[[dict[str, Any]], bool] | None = None,
+    ) -> Callable[[], None]:
+        """Call listener for matching events, return a remover."""
+        entry = (event_type, listener, event_filter)
+        self._listeners.append(entry)
+
+        def remove() -> None:
+            self._listeners.remove(entry)
+
+        return remove
+
+    def async_fire(self, event_type: str, event_data: dict[str, Any] | None = None):
+        """Call the listeners of event_type right away."""
+        event = SimulatedEvent(event_type, event_data or {})
+        for listened_type, listener, event_filter in list(self._listeners):
+            if listened_type == event_type and (
+                event_filter is None or event_filter(event.data)
+            ):
+                listener(event)
+
+
+class SimulatedStates:
+    """State machine that fires state_changed when a state changes."""
+
+    def __init__(self, bus: SimulatedBus) -> None:
+        """Initialize the states."""
+        self._bus = bus
+        self._states: dict[str, SimulatedState] = {}
+
+    def get(self, entity_id: str) -> SimulatedState | None:
+        """Return the state of entity_id."""
+        return self._states.get(entity_id)
+
+    def async_set(self, entity_id: str, new_state: Any) -> None:
+        """Set the state of entity_id, firing an event if it changed."""
+        new_state = str(new_state)
+        old_state = self._states.get(entity_id)
+        if old_state is not None and old_state.state == new_state:
+            return
+        state = self._states[entity_id] = SimulatedState(entity_id, new_state)
+        self._bus.async_fire(
+            "state_changed",
+            {"entity_id": entity_id, "old_state": old_state, "new_state": state},
+        )
+
+    def set_quietly(self, entity_id: str, new_state: Any) -> None:
+        """Set the state of entity_id without firing an event."""
+        self._states[entity_id] = SimulatedState(entity_id, str(new_state))
+
+
+class SimulatedHass:
+    """The parts of Home Assistant the controller uses."""
+
+    def __init__(self) -> None:
+        """Initialize the instance."""
+        self.bus = SimulatedBus()
+        self.states = SimulatedStates(self.bus)
+        self.data: dict[str, Any] = {}
+
+
+class SimulatedEntry:
+    """Config entry holding the controller options."""
+
+    def __init__(self, entry_id: str, options: dict[str, Any]) -> None:
+        """Initialize the entry."""
+        self.entry_id = entry_id
+        self.options = options
+
+
+class SimulatedCharger(RecordingActuator):
+    """Charger that reports the commanded amps after a response delay."""
+
+    def __init__(
+        self,
+        hass: SimulatedHass,
+        clock: VirtualClock,
+        current_amps_entity: str,
+        response_delay: float = 5.0,
+    ) -> None:
+        """Initialize the charger."""
+        super().__init__()
+        self._hass = hass
+        self._clock = clock
+        self._current_amps_entity = current_amps_entity
+        self._response_delay = response_delay
+        self.relay_cycles = 0
+        hass.states.async_set(current_amps_entity, 0.0)
+
+    def turn_on(self) -> None:
+        """Close the relay."""
+        if not self.switch_on:
+            self.relay_cycles += 1
+        super().turn_on()
+        self._respond_later()
+
+    def turn_off(self) -> None:
+        """Open the relay."""
+        super().turn_off()
+        self._respond_later()
+
+    def set_amps(self, amps: float) -> None:
+        """Change the requested amps."""
+        super().set_amps(amps)
+        self._respond_later()
+
+    def _respond_later(self) -> None:
+        self._clock.call_later(None, self._response_delay, self._respond)
+
+    def _respond(self, now: datetime) -> None:
+        amps = float(self.requested_amps) if self.switch_on else 0.0
+        self._hass.states.async_set(self._current_amps_entity, amps)
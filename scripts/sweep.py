@@ -0,0 +1,335 @@
+"""Rank controller configurations by replaying a recorded history.
+
+Every configuration in the sweep drives its own SolmateController and
+SolmateStateMachine against a virtual clock, in a pool of worker processes.
+The history is a numpy array of (timestamp, PV production W, home consumption
+without the car W, home battery SoC %) rows. Workers memory map it read-only,
+so they all share the same pages and a year of 1 Hz data costs about 1 GB of
+page cache in total, not per worker.
+
+Build a history from decision exports, then run a sweep, from the repository
+root (needs Home Assistant installed, like the integration itself):
+
+    python scripts/sweep.py convert exports/decisions-*.csv.gz -o history.npy
+    python scripts/sweep.py run history.npy --power-buffer 250 500 1000 \\
+        --home-battery-threshold 0 50 80 --debounce 3:30 10:60 \\
+        --amps-rounding floor nearest
+
+Each configuration scores the solar energy used at home, minus the energy
+imported from the grid, minus a cost per relay cycle and per charger command,
+all in kWh.
+"""
+
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import gzip
+import itertools
+import json
+import logging
+import math
+import os
+import sys
+from typing import Any
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custom_components.solmate.const import AMPS_ROUNDING_MODES
+from custom_components.solmate.energy import CHARGER_VOLTAGE
+from custom_components.solmate.solmate_controller import (
+    SolmateController,
+)
+from scripts.simulation import (
+    SimulatedCharger,
+    SimulatedEntry,
+    SimulatedHass,
+    VirtualClock,
+)
+
+ENTITIES = {
+    "home_consumption_entity": "sensor.home_consumption",
+    "pv_production_entity": "sensor.pv_production",
+    "home_battery_soc_entity": "sensor.home_battery_soc",
+    "fast_charge_button_entity": "binary_sensor.fast_charge",
+    "charger_switch_entity": "switch.charger",
+    "charger_requested_charging_amps_entity": "number.charger_requested_amps",
+    "charger_current_charging_amps_entity": "sensor.charger_current_amps",
+}
+
+# Rows converted to Python floats at a time.
+CHUNK_ROWS = 100_000
+KWH_PER_WATT_SECOND = 1 / 3_600_000
+
+_history: np.ndarray | None = None
+_consumption_includes_car = False
+
+
+def _read_rows(path: str):
+    """Yield the decision rows of an exported CSV or JSON Lines file."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", newline="") as file:
+        if ".jsonl" in path:
+            rows = (json.loads(line) for line in file if line.strip())
+        else:
+            rows = csv.DictReader(file)
+        for row in rows:
+            if row.get("kind") == "decision":
+                yield row
+
+
+def convert(paths: list[str], output: str, consumption_includes_car: bool) -> int:
+    """Convert decision exports into a history array, return the row count.
+
+    The exports are read twice, once to count the rows and once to write them
+    in chunks straight into the memory mapped output, so memory use doesn't
+    grow with the length of the history.
+    """
+    # Export file names start with their creation time.
+    paths = sorted(paths, key=os.path.basename)
+    count = sum(1 for path in paths for _ in _read_rows(path))
+    history = np.lib.format.open_memmap(
+        output, mode="w+", dtype=np.float64, shape=(count, 4)
+    )
+    chunk = np.empty((CHUNK_ROWS, 4))
+    written = filled = 0
+    for path in paths:
+        for row in _read_rows(path):
+            consumption = float(row["consumption"])
+            if consumption_includes_car:
+                consumption -= float(row["actual_amps"] or 0) * CHARGER_VOLTAGE
+            soc = row.get("home_battery_soc")
+            chunk[filled] = (
+                float(row["timestamp"]),
+                float(row["production"]),
+                consumption,
+                float(soc) if soc not in (None, "") else math.nan,
+            )
+            filled += 1
+            if filled == CHUNK_ROWS:
+                history[written : written + filled] = chunk
+                written += filled
+                filled = 0
+    history[written : written + filled] = chunk[:filled]
+
+    timestamps = history[:, 0]
+    if np.any(timestamps[1:] < timestamps[:-1]):
+        # Overlapping exports; sorting needs the whole history in memory.
+        history[:] = history[np.argsort(timestamps, kind="stable")]
+    history.flush()
+    return count
+
+
+def _init_worker(path: str, consumption_includes_car: bool) -> None:
+    """Map the history into the worker process."""
+    global _history, _consumption_includes_car
+    _history = np.load(path, mmap_mode="r")
+    _consumption_includes_car = consumption_includes_car
+    logging.getLogger("custom_components.solmate").setLevel(logging.CRITICAL)
+
+
+def simulate(options: dict[str, Any]) -> dict[str, Any]:
+    """Replay the history through a controller configured with options."""
+    history = _history
+    clock = VirtualClock(float(history[0, 0]))
+    hass = SimulatedHass()
+    charger = SimulatedCharger(
+        hass, clock, ENTITIES["charger_current_charging_amps_entity"]
+    )
+    controller = SolmateController(
+        hass,
+        SimulatedEntry("sweep", {**ENTITIES, **options}),
+        actuator=charger,
+        call_later=clock.call_later,
+        clock=lambda: clock.now,
+        persist=False,
+    )
+    states = hass.states
+    consumption_entity = ENTITIES["home_consumption_entity"]
+    production_entity = ENTITIES["pv_production_entity"]
+    soc_entity = ENTITIES["home_battery_soc_entity"]
+    amps_entity = ENTITIES["charger_current_charging_amps_entity"]
+
+    produced = exported = imported = 0.0
+    last: tuple[float, float, float, float] | None = None
+    started = False
+    for start in range(0, len(history), CHUNK_ROWS):
+        for timestamp, production, consumption, soc in history[
+            start : start + CHUNK_ROWS
+        ].tolist():
+            clock.advance_to(timestamp)
+            if last is not None:
+                last_timestamp, last_production, last_consumption, car_power = last
+                seconds = timestamp - last_timestamp
+                net = last_consumption + car_power - last_production
+                produced += last_production * seconds
+                exported += max(0.0, -net) * seconds
+                imported += max(0.0, net) * seconds
+
+            car_power = float(states.get(amps_entity).state) * CHARGER_VOLTAGE
+            # Update the whole row, then evaluate it once, like a poll cycle.
+            states.set_quietly(production_entity, production)
+            states.set_quietly(
+                consumption_entity,
+                consumption + car_power if _consumption_includes_car else consumption,
+            )
+            states.set_quietly(soc_entity, "unavailable" if math.isnan(soc) else soc)
+            if started:
+                controller._update_should_charge_on_surplus()  # noqa: SLF001
+            else:
+                controller.start()
+                started = True
+            last = (timestamp, production, consumption, car_power)
+    controller.stop()
+
+    self_consumed = (produced - exported) * KWH_PER_WATT_SECOND
+    return {
+        **options,
+        "self_consumption": self_consumed / (produced * KWH_PER_WATT_SECOND)
+        if produced
+        else 0.0,
+        "self_consumed_kwh": self_consumed,
+        "grid_import_kwh": imported * KWH_PER_WATT_SECOND,
+        "relay_cycles": charger.relay_cycles,
+        "commands": len(charger.commands),
+    }
+
+
+def score(result: dict[str, Any], cycle_cost: float, command_cost: float) -> float:
+    """Return the figure of merit of a result, in kWh."""
+    return (
+        result["self_consumed_kwh"]
+        - result["grid_import_kwh"]
+        - cycle_cost * result["relay_cycles"]
+        - command_cost * result["commands"]
+    )
+
+
+def configurations(args: argparse.Namespace) -> list[dict[str, Any]]:
+    """Return every combination of the swept options."""
+    return [
+        {
+            "power_buffer": power_buffer,
+            "charge_home_battery_first": True,
+            "home_battery_threshold": threshold,
+            "debounce_min": debounce[0],
+            "debounce_max": debounce[1],
+            "session_pause_min": session_pause[0],
+            "session_pause_max": session_pause[1],
+            "amps_rounding": rounding,
+        }
+        for power_buffer, threshold, debounce, session_pause, rounding in (
+            itertools.product(
+                args.power_buffer,
+                args.home_battery_threshold,
+                args.debounce,
+                args.session_pause,
+                args.amps_rounding,
+            )
+        )
+    ]
+
+
+def _bounds(value: str) -> tuple[float, float]:
+    """Parse MIN:MAX seconds."""
+    low, _, high = value.partition(":")
+    return float(low), float(high or low)
+
+
+def run(args: argparse.Namespace) -> None:
+    """Run the sweep and print the best configurations."""
+    configs = configurations(args)
+    workers = args.workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(
+        workers,
+        initializer=_init_worker,
+        initargs=(args.history, args.consumption_includes_car),
+    ) as executor:
+        results = list(
+            executor.map(
+                simulate, configs, chunksize=max(1, len(configs) // (workers * 4))
+            )
+        )
+    for result in results:
+        result["score"] = score(result, args.cycle_cost, args.command_cost)
+    results.sort(key=lambda result: result["score"], reverse=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+    print(f"Ran {len(results)} configurations on {workers} workers.")
+    for rank, result in enumerate(results[: args.top], 1):
+        print(
+            f"{rank:3}. score {result['score']:9.2f} kWh"
+            f"  self consumption {result['self_consumption']:6.1%}"
+            f"  grid {result['grid_import_kwh']:8.2f} kWh"
+            f"  cycles {result['relay_cycles']:5}"
+            f"  commands {result['commands']:6}"
+            f"  | buffer {result['power_buffer']:g} W"
+            f"  battery {result['home_battery_threshold']:g} %"
+            f"  debounce {result['debounce_min']:g}-{result['debounce_max']:g} s"
+            f"  pause {result['session_pause_min']:g}"
+            f"-{result['session_pause_max']:g} s"
+            f"  rounding {result['amps_rounding']}"
+        )
+
+
+def main() -> int:
+    """Parse the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--consumption-includes-car",
+        action="store_true",
+        help="the home consumption sensor also measures the car",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = commands.add_parser("convert", help="build a history file")
+    convert_parser.add_argument("exports", nargs="+")
+    convert_parser.add_argument("-o", "--output", required=True)
+
+    run_parser = commands.add_parser("run", help="sweep configurations")
+    run_parser.add_argument("history")
+    run_parser.add_argument("--power-buffer", type=float, nargs="+", default=[500])
+    run_parser.add_argument(
+        "--home-battery-threshold", type=float, nargs="+", default=[80]
+    )
+    run_parser.add_argument(
+        "--debounce", type=_bounds, nargs="+", default=[(3, 30)], metavar="MIN:MAX"
+    )
+    run_parser.add_argument(
+        "--session-pause",
+        type=_bounds,
+        nargs="+",
+        default=[(10, 120)],
+        metavar="MIN:MAX",
+    )
+    run_parser.add_argument(
+        "--amps-rounding",
+        choices=AMPS_ROUNDING_MODES,
+        nargs="+",
+        default=["floor"],
+    )
+    run_parser.add_argument("--cycle-cost", type=float, default=0.05)
+    run_parser.add_argument("--command-cost", type=float, default=0.005)
+    run_parser.add_argument("--workers", type=int, default=0)
+    run_parser.add_argument("--top", type=int, default=20)
+    run_parser.add_argument("--output", help="write every result to a CSV file")
+
+    args = parser.parse_args()
+    if args.command == "convert":
+        count = convert(args.exports, args.output, args.consumption_includes_car)
+        print(f"Wrote {count} rows to {args.output}.")
+    else:
+        run(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())